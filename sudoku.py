@@ -0,0 +1,681 @@
+import sys, time, pygame
+import sudoku_metrics
+from sudoku_corpus import CorpusReader
+from sudoku_generator import PuzzlePrefetcher, generate_sudoku
+from sudoku_solver import SudokuSolver
+
+"""
+The pygame front end - run this file to play
+Pass the path of a puzzle bank (see sudoku_corpus.py) to play puzzles from it instead
+of generating them: python3 sudoku.py puzzles.bank
+The puzzle generation itself lives in sudoku_generator.py, which does not need pygame
+
+Keys: 1-9 sketch a digit in the selected cell and Enter places it, Shift+1-9 toggles a
+pencil mark, Backspace/Delete clears the cell, and H sketches a hint
+
+"""
+
+
+# the 27 rows, columns, and boxes of the board, each as a name and its 9 (row, col) cells
+UNITS = ([("row", [(row, col) for col in range(9)]) for row in range(9)] +
+         [("column", [(row, col) for row in range(9)]) for col in range(9)] +
+         [("box", [(box // 3 * 3 + i // 3, box % 3 * 3 + i % 3) for i in range(9)]) for box in range(9)])
+
+# color of the small pencil mark digits
+MARK_COLOR = (110, 110, 110)
+
+
+# Glyph Cache
+
+# fonts and rendered text shared by every Cell and the Board
+# pygame.font.SysFont searches the installed fonts every time it is called, so each
+# font is only created once and each piece of text is only rendered once
+class GlyphCache:
+
+    def __init__(self):
+        self.fonts = {}
+        self.surfaces = {}
+
+    # font of the given size, created the first time it is asked for
+    def font(self, size, bold=False):
+        key = (size, bold)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.SysFont("arial", size, bold=bold)
+        return self.fonts[key]
+
+    # rendered surface for text, created the first time it is asked for
+    def render(self, text, size, color=(0, 0, 0), bold=False):
+        key = (text, size, color, bold)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.font(size, bold).render(text, True, color)
+            self.surfaces[key] = surface
+        return surface
+
+    # renders the digits 1-9 at the value, sketch, and pencil mark sizes ahead of time
+    def preload(self):
+        for num in range(1, 10):
+            self.render(str(num), 30)
+            self.render(str(num), 15)
+            self.render(str(num), 12, MARK_COLOR)
+
+    # drops everything - fonts stop working once pygame.quit() has been called
+    def clear(self):
+        self.fonts.clear()
+        self.surfaces.clear()
+
+
+glyphs = GlyphCache()
+
+
+# Cell Class
+
+class Cell:
+
+    # fixed attributes, so the 81 cells of every board carry no __dict__
+    __slots__ = ("value", "row", "col", "screen", "selected", "tempValue", "marks")
+
+    # Cell class iniz
+    # getting the value of the cell, the position, and which screen should be displayed
+    # also whether or not the cell is selected to be changed
+    # marks holds the pencil marks, bit n - 1 set for digit n
+    def __init__(self, value, row, col, screen):
+        self.value = value
+        self.row = row
+        self.col = col
+        self.screen = screen
+        self.selected = False
+        self.tempValue = 0
+        self.marks = 0
+
+    # setting a cells value
+    def set_cell_value(self, value):
+        self.value = value
+
+    # Temp value of a cell
+    def set_sketched_value(self, value):
+        self.tempValue = value
+
+    # drawing the cell
+    def draw(self):
+
+        # size of cell
+        cell_width = 540 // 9
+        cell_height = 540 // 9
+        x = self.col * cell_width
+        y = self.row * cell_height
+
+        # value of cell. Actual or sketched
+        if self.value != 0:
+            text = glyphs.render(str(self.value), 30)
+            text_rect = text.get_rect(center=(x + cell_width // 2, y + cell_height // 2))
+            self.screen.blit(text, text_rect)
+        elif self.tempValue != 0:
+            sketchText = glyphs.render(str(self.tempValue), 15)
+            self.screen.blit(sketchText, (x + cell_width // 2, y + cell_height // 2))
+        elif self.marks != 0:
+            # pencil marks in a 3x3 grid, 1 top left to 9 bottom right
+            for num in range(1, 10):
+                if self.marks & (1 << (num - 1)):
+                    markText = glyphs.render(str(num), 12, MARK_COLOR)
+                    self.screen.blit(markText, (x + 7 + (num - 1) % 3 * 18, y + 4 + (num - 1) // 3 * 18))
+
+        # selected cell drawing
+        if self.selected:
+            pygame.draw.rect(self.screen, (255, 0, 0), (x, y, cell_width, cell_height), 3)
+        else:
+            pygame.draw.rect(self.screen, (0, 0, 0), (x, y, cell_width, cell_height), 1)
+
+
+class Board:
+    # source is anything with a get(difficulty) method that returns a puzzle,
+    # e.g. a PuzzlePrefetcher; without one the puzzle is generated right here
+    def __init__(self, width, height, screen, difficulty, source=None):
+        self.width = width
+        self.height = height
+        self.screen = screen
+        self.difficulty = difficulty
+        self.selected_cell = None
+        if source is not None:
+            self.board_values = source.get(difficulty)
+        else:
+            self.board_values = generate_sudoku(9, difficulty, unique=True)
+        self.original_board = [row[:] for row in self.board_values]
+        self.cells = []
+        for row in range(9):
+            row_cells = []
+            for col in range(9):
+                value = self.board_values[row][col]
+                cell = Cell(value, row, col, screen)
+                row_cells.append(cell)
+            self.cells.append(row_cells)
+        self.count_values()
+
+        # solved once up front, so hints on a puzzle with one solution never have to search
+        # puzzles from a bank need not be unique, and then a digit that differs from this
+        # solution can still be right
+        solver = SudokuSolver(self.original_board)
+        self.solution = solver.solve()
+        self.unique = solver.count(2) == 1
+
+        button_width = 150
+        button_height = 40
+        self.reset_button = pygame.Rect(30, 550, button_width, button_height)
+        self.new_game_button = pygame.Rect(195, 550, button_width, button_height)
+        self.exit_button = pygame.Rect(360, 550, button_width, button_height)
+
+        # retained-mode rendering: the grid lines and buttons never change, so they are
+        # drawn once onto background, and render only redraws the cells marked dirty
+        self.background = None
+        self.dirty = set()
+        self.full_redraw = True
+
+    def draw(self):
+        self.screen.fill((255, 255, 255))
+        self.draw_grid(self.screen)
+
+        for row in self.cells:
+            for cell in row:
+                cell.draw()
+
+    def draw_grid(self, surface):
+        for i in range(10):
+            line_thickness = 4 if i % 3 == 0 else 1
+            pygame.draw.line(surface, (0, 0, 0), (0, i * self.height // 9), (self.width, i * self.height // 9),
+                             line_thickness)
+            pygame.draw.line(surface, (0, 0, 0), (i * self.width // 9, 0), (i * self.width // 9, self.height),
+                             line_thickness)
+
+    # marks a cell to be redrawn by the next render
+    def mark_dirty(self, row, col):
+        self.dirty.add((row, col))
+
+    # marks the whole window to be redrawn by the next render, e.g. after it was covered
+    def mark_all_dirty(self):
+        self.full_redraw = True
+
+    # whether the next render has anything to draw
+    def is_dirty(self):
+        return self.full_redraw or len(self.dirty) > 0
+
+    # redraws only what changed since the last call
+    # returns the list of rects that changed, ready for pygame.display.update(rects)
+    def render(self):
+        if self.background is None:
+            self.background = pygame.Surface(self.screen.get_size())
+            self.background.fill((255, 255, 255))
+            self.draw_grid(self.background)
+            self.draw_buttons(self.background)
+
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            for row in self.cells:
+                for cell in row:
+                    cell.draw()
+            self.full_redraw = False
+            self.dirty.clear()
+            return [self.screen.get_rect()]
+
+        rects = []
+        cell_width = self.width // 9
+        cell_height = self.height // 9
+        for row, col in self.dirty:
+            rect = pygame.Rect(col * cell_width, row * cell_height, cell_width, cell_height)
+            self.screen.blit(self.background, rect, rect)
+            self.cells[row][col].draw()
+            rects.append(rect)
+        self.dirty.clear()
+        return rects
+
+    def select(self, row, col):
+        if self.selected_cell:
+            self.selected_cell.selected = False
+            self.mark_dirty(self.selected_cell.row, self.selected_cell.col)
+        self.selected_cell = self.cells[row][col]
+        self.selected_cell.selected = True
+        self.mark_dirty(row, col)
+
+    def click(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            row = y // (self.height // 9)
+            col = x // (self.width // 9)
+            return row, col
+        return None
+
+    def clear(self):
+        if self.selected_cell and self.original_board[self.selected_cell.row][self.selected_cell.col] == 0:
+            self.set_value(self.selected_cell.row, self.selected_cell.col, 0)
+            self.selected_cell.set_sketched_value(0)
+            self.selected_cell.marks = 0
+            self.mark_dirty(self.selected_cell.row, self.selected_cell.col)
+
+    def sketch(self, value):
+        if self.selected_cell:
+            self.selected_cell.set_sketched_value(value)
+            self.mark_dirty(self.selected_cell.row, self.selected_cell.col)
+
+    # turns the pencil mark for value in the selected empty cell on or off
+    def toggle_mark(self, value):
+        if self.selected_cell and self.selected_cell.value == 0:
+            self.selected_cell.marks ^= 1 << (value - 1)
+            self.mark_dirty(self.selected_cell.row, self.selected_cell.col)
+
+    def place_number(self, value):
+        if self.selected_cell and self.original_board[self.selected_cell.row][self.selected_cell.col] == 0:
+            self.set_value(self.selected_cell.row, self.selected_cell.col, value)
+            self.mark_dirty(self.selected_cell.row, self.selected_cell.col)
+            self.eliminate_mark(self.selected_cell.row, self.selected_cell.col, value)
+
+    # removes the pencil mark for value from the cells sharing a row, column, or box
+    # with (row, col) - only those 20 cells are looked at
+    def eliminate_mark(self, row, col, value):
+        bit = 1 << (value - 1)
+        box_row = row - row % 3
+        box_col = col - col % 3
+        for i in range(9):
+            for r, c in ((row, i), (i, col), (box_row + i // 3, box_col + i % 3)):
+                cell = self.cells[r][c]
+                if cell.marks & bit:
+                    cell.marks &= ~bit
+                    self.mark_dirty(r, c)
+
+    # the digits still possible in every cell, as 9x9 masks (bit n - 1 for digit n, 0 for
+    # filled cells), read off the row, column, and box counts that set_value keeps
+    def candidate_masks(self):
+        row_used = [0] * 9
+        col_used = [0] * 9
+        box_used = [0] * 9
+        for num in range(1, 10):
+            bit = 1 << (num - 1)
+            for i in range(9):
+                if self.row_counts[i][num]:
+                    row_used[i] |= bit
+                if self.col_counts[i][num]:
+                    col_used[i] |= bit
+                if self.box_counts[i][num]:
+                    box_used[i] |= bit
+
+        masks = []
+        for row in range(9):
+            row_masks = []
+            for col in range(9):
+                if self.board_values[row][col] != 0:
+                    row_masks.append(0)
+                else:
+                    row_masks.append(0x1FF & ~(row_used[row] | col_used[col] | box_used[(row // 3) * 3 + col // 3]))
+            masks.append(row_masks)
+        return masks
+
+    # the next step for the player, as (row, col, value, reason), or None if there is none
+    # a mistake is pointed out first - a placed digit that differs from the solution, or
+    # if the puzzle has more than one solution, one that breaks a rule (value is then 0,
+    # to clear it); after that the easiest single is found from the live candidates, and
+    # only when there is none does the hint fall back to a solution, at the cell with the
+    # fewest candidates
+    def hint(self):
+        if self.solution is None:
+            return None
+        for row in range(9):
+            for col in range(9):
+                value = self.board_values[row][col]
+                if value == 0 or self.original_board[row][col] != 0:
+                    continue
+                if self.unique and value != self.solution[row][col]:
+                    return row, col, self.solution[row][col], "mistake"
+                if not self.unique and self.has_conflict(row, col):
+                    return row, col, 0, "mistake"
+
+        masks = self.candidate_masks()
+        best = None
+        best_count = 10
+        for row in range(9):
+            for col in range(9):
+                mask = masks[row][col]
+                if self.board_values[row][col] == 0:
+                    if mask & (mask - 1) == 0 and mask != 0:
+                        return row, col, mask.bit_length(), "naked single"
+                    count = bin(mask).count("1")
+                    if count < best_count:
+                        best = (row, col)
+                        best_count = count
+        if best is None:
+            return None
+
+        for name, cells in UNITS:
+            once = 0
+            twice = 0
+            for row, col in cells:
+                twice |= once & masks[row][col]
+                once |= masks[row][col]
+            hidden = once & ~twice
+            if hidden:
+                bit = hidden & -hidden
+                for row, col in cells:
+                    if masks[row][col] & bit:
+                        return row, col, bit.bit_length(), "hidden single in " + name
+
+        row, col = best
+        solution = self.solution
+        if not self.unique:
+            # one that agrees with the digits placed so far - None if they allow no solution
+            solution = SudokuSolver(self.board_values).solve()
+            if solution is None:
+                return None
+        return row, col, solution[row][col], "solution"
+
+    # selects the cell of the next hint and sketches its digit there, ready for Enter,
+    # or clears the cell if the hint is to remove a mistake (value 0)
+    # returns the hint, or None if there is none
+    def show_hint(self):
+        step = self.hint()
+        if step is not None:
+            row, col, value, reason = step
+            self.select(row, col)
+            if value == 0:
+                self.clear()
+            else:
+                self.sketch(value)
+        return step
+
+    def reset_to_original(self):
+        for row in range(9):
+            for col in range(9):
+                cell = self.cells[row][col]
+                if cell.value != self.original_board[row][col] or cell.tempValue != 0 or cell.marks != 0:
+                    self.set_value(row, col, self.original_board[row][col])
+                    cell.set_sketched_value(0)
+                    cell.marks = 0
+                    self.mark_dirty(row, col)
+
+    def is_full(self):
+        return self.filled == 81
+
+    # rebuilds board_values from the cells - only needed if a cell was changed
+    # directly instead of through set_value
+    def update_board(self):
+        self.board_values = []
+        for row in self.cells:
+            row_values = []
+            for cell in row:
+                row_values.append(cell.value)
+            self.board_values.append(row_values)
+        self.count_values()
+
+    # writes value (0 to clear) into a cell and keeps board_values and the counts
+    # below in step, touching only that cell's row, column, and box
+    def set_value(self, row, col, value):
+        old = self.board_values[row][col]
+        if old == value:
+            return
+        box = (row // 3) * 3 + col // 3
+        if old != 0:
+            self.filled -= 1
+            for counts in (self.row_counts[row], self.col_counts[col], self.box_counts[box]):
+                counts[old] -= 1
+                if counts[old] > 0:
+                    self.conflicts -= 1
+        if value != 0:
+            self.filled += 1
+            for counts in (self.row_counts[row], self.col_counts[col], self.box_counts[box]):
+                if counts[value] > 0:
+                    self.conflicts += 1
+                counts[value] += 1
+        self.board_values[row][col] = value
+        self.cells[row][col].set_cell_value(value)
+
+    # counts every digit in every row, column, and box from scratch
+    # row_counts[r][n] is how many times n appears in row r (same for cols and boxes),
+    # filled is the number of non-empty cells, and conflicts is the number of extra
+    # copies of a digit in a row, column, or box - 0 means no rule is broken
+    def count_values(self):
+        self.row_counts = [[0] * 10 for i in range(9)]
+        self.col_counts = [[0] * 10 for i in range(9)]
+        self.box_counts = [[0] * 10 for i in range(9)]
+        self.filled = 0
+        self.conflicts = 0
+        for row in range(9):
+            for col in range(9):
+                value = self.board_values[row][col]
+                if value != 0:
+                    self.filled += 1
+                    box = (row // 3) * 3 + col // 3
+                    for counts in (self.row_counts[row], self.col_counts[col], self.box_counts[box]):
+                        if counts[value] > 0:
+                            self.conflicts += 1
+                        counts[value] += 1
+
+    # whether the value in a cell clashes with another cell in its row, column, or box
+    def has_conflict(self, row, col):
+        value = self.board_values[row][col]
+        if value == 0:
+            return False
+        box = (row // 3) * 3 + col // 3
+        return self.row_counts[row][value] > 1 or self.col_counts[col][value] > 1 or self.box_counts[box][value] > 1
+
+    def find_empty(self):
+        for row in range(9):
+            for col in range(9):
+                if self.cells[row][col].value == 0:
+                    return row, col
+        return None
+
+    def check_board(self):
+        return self.filled == 81 and self.conflicts == 0
+
+    def is_valid(self, row, col, num):
+
+        for c in range(9):
+            if self.board_values[row][c] == num:
+                return False
+
+        for r in range(9):
+            if self.board_values[r][col] == num:
+                return False
+
+        box_row = row - row % 3
+        box_col = col - col % 3
+        for r in range(box_row, box_row + 3):
+            for c in range(box_col, box_col + 3):
+                if self.board_values[r][c] == num:
+                    return False
+
+        return True
+
+    def draw_text_middle(self, screen, text, size, color):
+        label = glyphs.render(text, size, color, bold=True)
+        label_rect = label.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2))
+        screen.blit(label, label_rect)
+        pygame.display.update()
+
+    # surface defaults to the screen; render draws the buttons onto its background instead
+    def draw_buttons(self, surface=None):
+        if surface is None:
+            surface = self.screen
+
+        pygame.draw.rect(surface, (200, 200, 200), self.reset_button)
+        pygame.draw.rect(surface, (200, 200, 200), self.new_game_button)
+        pygame.draw.rect(surface, (200, 200, 200), self.exit_button)
+
+        reset_text = glyphs.render("Reset", 24)
+        new_game_text = glyphs.render("New Game", 24)
+        exit_text = glyphs.render("Exit", 24)
+
+        surface.blit(reset_text, (self.reset_button.x + 35, self.reset_button.y + 7))
+        surface.blit(new_game_text, (self.new_game_button.x + 15, self.new_game_button.y + 7))
+        surface.blit(exit_text, (self.exit_button.x + 50, self.exit_button.y + 7))
+
+
+    #static to show diffculty screen
+    def show_difficulty_screen(screen):
+        screen.fill((255, 255, 255))
+
+        easy_button = pygame.Rect(170, 200, 200, 60)
+        medium_button = pygame.Rect(170, 300, 200, 60)
+        hard_button = pygame.Rect(170, 400, 200, 60)
+
+        pygame.draw.rect(screen, (0, 200, 0), easy_button)
+        pygame.draw.rect(screen, (255, 165, 0), medium_button)
+        pygame.draw.rect(screen, (200, 0, 0), hard_button)
+
+        screen.blit(glyphs.render("Easy", 40), (235, 210))
+        screen.blit(glyphs.render("Medium", 40), (215, 310))
+        screen.blit(glyphs.render("Hard", 40), (235, 410))
+
+        pygame.display.update()
+
+        while True:
+            # nothing on this screen moves, so sleep until the next event
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                quit()
+
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                x, y = pygame.mouse.get_pos()
+                if easy_button.collidepoint(x, y):
+                    return 30
+                elif medium_button.collidepoint(x, y):
+                    return 40
+                elif hard_button.collidepoint(x, y):
+                    return 50
+
+            if event.type == pygame.VIDEOEXPOSE:
+                pygame.display.update()
+
+
+# the number keys and keypad keys for each digit
+DIGIT_KEYS = {}
+for num in range(1, 10):
+    DIGIT_KEYS[getattr(pygame, "K_" + str(num))] = num
+    DIGIT_KEYS[getattr(pygame, "K_KP" + str(num))] = num
+
+
+# corpus_path is an optional puzzle bank file to take puzzles from
+# rated picks puzzles by the techniques needed to solve them instead of by hole count
+def main(corpus_path=None, rated=False):
+    pygame.init()
+    screen = pygame.display.set_mode((540, 600))
+    pygame.display.set_caption("Sudoku")
+    glyphs.preload()
+
+    # mouse movement is never used, and would wake the idle loop below for nothing
+    pygame.event.set_blocked(pygame.MOUSEMOTION)
+
+    # start generating while the player is still picking a difficulty
+    if corpus_path is None and rated:
+        # needs NumPy, so only imported when asked for
+        from sudoku_rater import RatedPuzzleSource
+        source = PuzzlePrefetcher(source=RatedPuzzleSource())
+    elif corpus_path is None:
+        source = PuzzlePrefetcher()
+    else:
+        source = CorpusReader(corpus_path)
+    difficulty = Board.show_difficulty_screen(screen)
+    board = Board(540, 540, screen, difficulty, source)
+    clock = pygame.time.Clock()
+    running = True
+    game_over = False
+    won = False
+    message_drawn = False
+
+    while running:
+        # when nothing is waiting to be drawn, block until the next event instead of
+        # polling; while the board is changing, clock.tick below still caps it at 60 fps
+        if board.is_dirty() or (game_over and not message_drawn):
+            events = pygame.event.get()
+        else:
+            events = [pygame.event.wait()] + pygame.event.get()
+
+        # waiting above is idle time, so a frame is timed from here
+        timing = sudoku_metrics.enabled
+        if timing:
+            frame_start = time.perf_counter()
+
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+
+            # the window was uncovered - everything has to be drawn again
+            if event.type == pygame.VIDEOEXPOSE:
+                board.mark_all_dirty()
+                message_drawn = False
+
+            if not game_over:
+
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    if mouse_y < 540:  # only click inside board
+                        clicked = board.click(mouse_x, mouse_y)
+                        if clicked:
+                            row, col = clicked
+                            board.select(row, col)
+                    else:
+                        if board.reset_button.collidepoint((mouse_x, mouse_y)):
+                            board.reset_to_original()
+                        if board.new_game_button.collidepoint((mouse_x, mouse_y)):
+                            board = Board(540, 540, screen, difficulty, source)
+                            game_over = False
+                            won = False
+                        if board.exit_button.collidepoint((mouse_x, mouse_y)):
+                            running = False
+
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_h:
+                        step = board.show_hint()
+                        if step is not None:
+                            pygame.display.set_caption("Sudoku - hint: " + step[3])
+
+                    if board.selected_cell:
+                        num = DIGIT_KEYS.get(event.key)
+                        if num is not None and event.mod & pygame.KMOD_SHIFT:
+                            board.toggle_mark(num)
+                        elif num is not None:
+                            board.sketch(num)
+
+                        if event.key == pygame.K_RETURN:
+                            temp = board.selected_cell.tempValue
+                            if temp != 0:
+                                board.place_number(temp)
+                                if board.is_full():
+                                    if board.check_board():
+                                        won = True
+                                    else:
+                                        won = False
+                                    game_over = True
+
+                        if event.key in (pygame.K_BACKSPACE, pygame.K_DELETE):
+                            board.clear()
+
+        if timing:
+            handled = time.perf_counter()
+
+        # only the cells that changed are redrawn and pushed to the display
+        rects = board.render()
+        if timing:
+            drawn = time.perf_counter()
+
+        # Checks if game over
+        if game_over and not message_drawn:
+            if won:
+                board.draw_text_middle(screen, "You Win!", 50, (0, 255, 0))
+            else:
+                board.draw_text_middle(screen, "Game Over", 50, (255, 0, 0))
+            message_drawn = True
+        elif rects:
+            pygame.display.update(rects)
+        if timing:
+            sudoku_metrics.record_frame(frame_start, handled, drawn, time.perf_counter())
+        clock.tick(60)
+
+    if corpus_path is None:
+        source.stop()
+    else:
+        source.close()
+    glyphs.clear()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    # python3 sudoku.py [puzzle bank] [--rated]
+    paths = [arg for arg in sys.argv[1:] if arg != "--rated"]
+    main(paths[0] if paths else None, "--rated" in sys.argv[1:])
@@ -0,0 +1,398 @@
+import argparse, json, os, platform, random, statistics, sys, time
+
+# rendering runs headless - these have to be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from sudoku_generator import SudokuGenerator, generate_sudoku, generate_sudoku_with_solution
+from sudoku_solver import SudokuSolver
+
+"""
+Repeatable benchmark suite for generation, solving, validation, and rendering
+
+Every benchmark is seeded, and the ones that need a new board per call restart their
+seeds every round, so each round and each run times the same work. A benchmark is
+called in a loop until one round takes at least --min-time, and the best and median
+time per call over --repeat rounds are reported. Results can be saved as JSON and
+compared with an earlier run to catch regressions:
+    python3 sudoku_bench.py -o before.json
+    python3 sudoku_bench.py --compare before.json -o after.json
+    python3 sudoku_bench.py -k generate
+
+Benchmarks that need NumPy are skipped when it is not installed.
+
+"""
+
+RESULTS_VERSION = 1
+SEED = 2024
+
+
+class Benchmark:
+    '''
+    one timed operation
+    This should initialize:
+    self.name			- the name results are saved under
+    self.setup			- a function returning the state each call works on (not timed)
+    self.call			- the function being timed, called with that state
+    self.fresh			- True if every call needs a new state (the call changes it)
+    self.reset			- an optional function called at the start of every round, so
+    					  a fresh benchmark's setup makes the same states each round
+
+    Parameters:
+    name, setup, call, fresh, and reset are stored as above
+
+    Return:
+    None
+    '''
+
+    def __init__(self, name, setup, call, fresh=False, reset=None):
+        self.name = name
+        self.setup = setup
+        self.call = call
+        self.fresh = fresh
+        self.reset = reset
+
+    '''
+    Times number calls and returns the total time
+    With fresh set, setup runs before every call but only the calls are timed
+
+	Parameters:
+	number is the number of calls
+
+	Return: float (seconds)
+    '''
+
+    def time(self, number):
+        if self.reset is not None:
+            self.reset()
+        call = self.call
+        if self.fresh:
+            total = 0.0
+            for i in range(number):
+                state = self.setup()
+                start = time.perf_counter()
+                call(state)
+                total += time.perf_counter() - start
+            return total
+        state = self.setup()
+        start = time.perf_counter()
+        for i in range(number):
+            call(state)
+        return time.perf_counter() - start
+
+    '''
+    Runs the benchmark - finds how many calls take min_time, then times that many repeat times
+
+	Parameters:
+	repeat is the number of timed rounds
+	min_time is the shortest a round should take, in seconds
+
+	Return: dict of best and median seconds per call, the calls per round, and the rounds
+    '''
+
+    def run(self, repeat, min_time):
+        number = 1
+        while True:
+            elapsed = self.time(number)
+            if elapsed >= min_time:
+                break
+            number = number * 2 if elapsed == 0 else max(number * 2, int(number * min_time / elapsed * 1.1))
+        times = [elapsed / number]
+        for i in range(repeat - 1):
+            times.append(self.time(number) / number)
+        return {"best": min(times), "median": statistics.median(times), "number": number, "repeat": repeat}
+
+
+'''
+Returns a setup function that gives a new random.Random with the same seed each time,
+so every round of a benchmark does the same work
+
+Parameters: None
+Return: function
+'''
+
+
+def seeded():
+    return lambda: random.Random(SEED)
+
+
+class SeedSequence:
+    '''
+    the seeds of the new SudokuGenerators a fresh benchmark works on, one per call
+    This should initialize:
+    self.rng			- the random.Random the seeds are drawn from
+
+    reset() starts the sequence over, so every round (and every run) times the same
+    boards however many calls calibration used up
+
+    Parameters: None
+
+    Return:
+    None
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rng = random.Random(SEED)
+
+    '''
+    A new SudokuGenerator seeded from the sequence
+
+	Parameters:
+	holes is the number of cells remove_cells should remove
+	filled is a boolean - whether to build its full solution with fill_values first
+
+	Return: SudokuGenerator
+    '''
+
+    def generator(self, holes, filled):
+        generator = SudokuGenerator(9, holes, random.Random(self.rng.getrandbits(64)))
+        if filled:
+            generator.fill_values()
+        return generator
+
+
+'''
+A fresh benchmark of SudokuGenerator.remove_cells on generators that have just built
+a full solution
+
+Parameters:
+name is the benchmark name
+holes is the number of cells remove_cells should remove
+unique is passed to remove_cells
+
+Return: Benchmark
+'''
+
+
+def remove_cells_benchmark(name, holes, unique=False):
+    seeds = SeedSequence()
+    return Benchmark(name, lambda: seeds.generator(holes, True),
+                     lambda generator: generator.remove_cells(unique=unique), fresh=True, reset=seeds.reset)
+
+
+'''
+Builds the list of every benchmark
+
+Parameters: None
+Return: list[Benchmark]
+'''
+
+
+def build_benchmarks():
+    seeds = SeedSequence()
+    benchmarks = [
+        Benchmark("SudokuGenerator.fill_values", lambda: seeds.generator(0, False),
+                  lambda generator: generator.fill_values(), fresh=True, reset=seeds.reset),
+    ]
+    for holes in (30, 40, 50):
+        benchmarks.append(remove_cells_benchmark("SudokuGenerator.remove_cells[" + str(holes) + "]", holes))
+    benchmarks.append(remove_cells_benchmark("SudokuGenerator.remove_cells[50,unique]", 50, unique=True))
+    # the difficulties offered on the difficulty screen, made the way Board makes them
+    for holes in (30, 40, 50):
+        benchmarks.append(Benchmark("generate_sudoku[" + str(holes) + "]", seeded(),
+                                    lambda rng, holes=holes: generate_sudoku(9, holes, unique=True, rng=rng)))
+
+    puzzle, solution = generate_sudoku_with_solution(9, 55, unique=True, rng=SEED)
+    benchmarks.append(Benchmark("SudokuSolver.solve[55]", lambda: puzzle,
+                                lambda board: SudokuSolver(board).solve()))
+    benchmarks.append(Benchmark("SudokuSolver.count[55,limit=2]", lambda: puzzle,
+                                lambda board: SudokuSolver(board).count(2)))
+
+    benchmarks += board_benchmarks(puzzle, solution)
+    benchmarks += numpy_benchmarks()
+    return benchmarks
+
+
+'''
+The Board benchmarks - checking and drawing, on a dummy SDL display
+
+Parameters:
+puzzle and solution are 2D lists
+
+Return: list[Benchmark]
+'''
+
+
+def board_benchmarks(puzzle, solution):
+    import pygame
+    from sudoku import Board, glyphs
+
+    class FixedSource:
+        def __init__(self, board):
+            self.board = board
+
+        def get(self, difficulty):
+            return [row[:] for row in self.board]
+
+    pygame.init()
+    screen = pygame.display.set_mode((540, 600))
+    glyphs.preload()
+    solved = Board(540, 540, screen, 0, FixedSource(solution))
+    playing = Board(540, 540, screen, 55, FixedSource(puzzle))
+    playing.select(4, 4)
+
+    def render_one(board):
+        board.mark_dirty(4, 4)
+        board.render()
+
+    def render_all(board):
+        board.mark_all_dirty()
+        board.render()
+
+    playing.render()
+    return [
+        Benchmark("Board.check_board[solved]", lambda: solved, lambda board: board.check_board()),
+        Benchmark("Board.check_board[playing]", lambda: playing, lambda board: board.check_board()),
+        Benchmark("Board.draw", lambda: playing, lambda board: board.draw()),
+        Benchmark("Board.render[one cell]", lambda: playing, render_one),
+        Benchmark("Board.render[full]", lambda: playing, render_all),
+    ]
+
+
+'''
+The benchmarks of the NumPy modules, or none if NumPy is not installed
+
+Parameters: None
+Return: list[Benchmark]
+'''
+
+
+def numpy_benchmarks():
+    try:
+        import numpy as np
+        from sudoku_rater import rate_puzzles
+        from sudoku_validate import validate_boards
+    except ImportError:
+        print("NumPy not installed - skipping the validation and rating benchmarks", file=sys.stderr)
+        return []
+
+    from sudoku_generator import generate_sudoku_batch
+    pairs = list(generate_sudoku_batch(256, 55, workers=1, unique=True, seed=SEED))
+    puzzles = np.array([puzzle for puzzle, solution in pairs], dtype=np.uint8)
+    solutions = np.tile(np.array([solution for puzzle, solution in pairs], dtype=np.uint8), (256, 1, 1))
+    return [
+        Benchmark("validate_boards[65536]", lambda: solutions, validate_boards),
+        Benchmark("rate_puzzles[256,55]", lambda: puzzles, rate_puzzles),
+    ]
+
+
+'''
+Formats a time in seconds with a unit that suits it
+
+Parameters:
+seconds is a float
+
+Return: str
+'''
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return "%.3g %s" % (seconds / scale, unit)
+    return "%.3g ns" % (seconds / 1e-9)
+
+
+'''
+Builds the argument parser for the benchmark suite
+
+Parameters: None
+Return: argparse.ArgumentParser
+'''
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark sudoku generation, solving, validation, and rendering.")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per benchmark (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="shortest time one round should take, in seconds (default: 0.2)")
+    parser.add_argument("-o", "--output", default=None, help="save the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="compare with results saved by an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown of the best time that counts as a regression (default: 0.10 = 10%%)")
+    return parser
+
+
+'''
+Runs the benchmark suite
+
+Parameters:
+argv is the list of arguments (default: sys.argv[1:])
+
+Return: int (the exit status - 1 if --compare found a regression)
+'''
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    baseline = {}
+    if args.compare is not None:
+        with open(args.compare) as saved:
+            baseline = json.load(saved)["results"]
+
+    results = {}
+    regressions = []
+    print("%-40s %10s %10s %10s %8s" % ("benchmark", "best", "median", "before", "change"))
+    for benchmark in build_benchmarks():
+        if args.filter not in benchmark.name:
+            continue
+        result = benchmark.run(args.repeat, args.min_time)
+        results[benchmark.name] = result
+
+        before = baseline.get(benchmark.name)
+        old_time = change = ""
+        if before is not None:
+            ratio = result["best"] / before["best"]
+            old_time = format_time(before["best"])
+            change = "%+.1f%%" % ((ratio - 1) * 100)
+            if ratio > 1 + args.threshold:
+                regressions.append(benchmark.name)
+                change += " !"
+        print("%-40s %10s %10s %10s %8s" % (benchmark.name, format_time(result["best"]),
+                                            format_time(result["median"]), old_time, change))
+
+    if args.output is not None:
+        with open(args.output, "w") as out:
+            json.dump(environment_info(results), out, indent=2)
+    if regressions:
+        print(str(len(regressions)) + " regression(s): " + ", ".join(regressions), file=sys.stderr)
+        return 1
+    return 0
+
+
+'''
+Wraps the results with what they were measured on, for the saved JSON file
+
+Parameters:
+results is a dict of benchmark name -> result dict
+
+Return: dict
+'''
+
+
+def environment_info(results):
+    import pygame
+    info = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pygame": pygame.version.ver,
+        "cpus": os.cpu_count(),
+    }
+    try:
+        import numpy
+        info["numpy"] = numpy.__version__
+    except ImportError:
+        info["numpy"] = None
+    info["results"] = results
+    return info
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import argparse, json, math, os, sys, time
+import sudoku_metrics
+from sudoku_corpus import CorpusWriter
+from sudoku_generator import board_to_string, check_removed, generate_sudoku_batch
+
+"""
+Headless command line puzzle generator - no pygame needed
+
+Writes one puzzle per line, as it is generated, to stdout or a file:
+    python3 sudoku_cli.py --count 1000 --holes 50 --unique --seed 1 > puzzles.jsonl
+    python3 sudoku_cli.py --count 1000000 --format compact --workers 8 --stats -o puzzles.txt
+    python3 sudoku_cli.py --count 100000 --holes 50 --unique --format corpus -o hard.bank
+    python3 sudoku_cli.py --count 100000 --holes 55 --unique --rate --format corpus -o rated.bank
+    python3 sudoku_cli.py --count 100000 --holes 50 --dedup seen.idx --format corpus -o more.bank
+
+"""
+
+
+'''
+Builds the argument parser for the command line tool
+
+Parameters: None
+Return: argparse.ArgumentParser
+'''
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate sudoku puzzles and their solutions.")
+    parser.add_argument("-n", "--count", type=int, default=1, help="number of puzzles (default: 1)")
+    parser.add_argument("--holes", type=int, default=40, help="cells to remove from each puzzle (default: 40)")
+    parser.add_argument("--size", type=int, default=9, help="rows/columns of the board: 9, 16, 25, ... (default: 9)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible set of puzzles")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, 0 for one per CPU (default: 1)")
+    parser.add_argument("--unique", action="store_true", help="only emit puzzles with exactly one solution")
+    parser.add_argument("--mode", choices=("backtrack", "transform"), default="backtrack",
+                        help="how solutions are built (default: backtrack)")
+    parser.add_argument("--format", choices=("jsonl", "compact", "corpus"), default="jsonl",
+                        help="jsonl: {\"puzzle\": [[...]], \"solution\": [[...]]} per line; "
+                             "compact: '<puzzle> <solution>' as one-line boards; "
+                             "corpus: a binary puzzle bank, needs -o (default: jsonl)")
+    parser.add_argument("-o", "--output", default="-", help="file to write to (default: stdout)")
+    parser.add_argument("--rate", action="store_true",
+                        help="rate each puzzle by the solving techniques it needs, needs NumPy "
+                             "(jsonl: a \"rating\" field; compact: a third column; corpus: the rating field)")
+    parser.add_argument("--dedup", nargs="?", const="", default=None, metavar="INDEX",
+                        help="drop puzzles equivalent to one already written, up to symmetry, needs NumPy; "
+                             "with a file, the index is loaded from and saved to it so repeated runs "
+                             "stay distinct (--count is then the number generated, not written; "
+                             "at most 64 --holes on 9x9 boards)")
+    parser.add_argument("--metrics", default=None, metavar="FILE",
+                        help="record generation phase times and search counts and write them to FILE, "
+                             "as JSON if it ends in .json, else Prometheus text (only covers --workers 1)")
+    parser.add_argument("--stats", action="store_true", help="print a puzzles-per-second summary to stderr")
+    return parser
+
+
+'''
+Formats one generated puzzle as a line of output
+
+Parameters:
+puzzle and solution are 2D lists
+output_format is "jsonl" or "compact"
+rating is the puzzle's rating, or None if it was not rated
+
+Return: str (without the newline)
+'''
+
+
+def format_puzzle(puzzle, solution, output_format, rating=None):
+    if output_format == "compact":
+        line = board_to_string(puzzle) + " " + board_to_string(solution)
+        if rating is not None:
+            line += " " + str(rating)
+        return line
+    record = {"puzzle": puzzle, "solution": solution}
+    if rating is not None:
+        record["rating"] = rating
+    return json.dumps(record, separators=(",", ":"))
+
+
+'''
+Rates a stream of puzzles in blocks with sudoku_rater.rate_puzzles
+Ratings are the rater's score, clamped to 1 to 65535 so they fit a puzzle bank record
+
+Parameters:
+puzzles is an iterable of (puzzle, solution) pairs
+block is the number of puzzles rated together
+
+Return: generator of (puzzle, solution, rating)
+'''
+
+
+def rate_stream(puzzles, block=4096):
+    # needs NumPy, so only imported when --rate is used
+    from sudoku_rater import rate_puzzles
+
+    pending = []
+    for pair in puzzles:
+        pending.append(pair)
+        if len(pending) == block:
+            yield from rate_pending(pending, rate_puzzles)
+            pending = []
+    if pending:
+        yield from rate_pending(pending, rate_puzzles)
+
+
+def rate_pending(pending, rate_puzzles):
+    scores = rate_puzzles([puzzle for puzzle, solution in pending]).score
+    for i in range(len(pending)):
+        yield pending[i][0], pending[i][1], min(max(int(scores[i]), 1), 65535)
+
+
+'''
+Runs the command line tool
+
+Parameters:
+argv is the list of arguments (default: sys.argv[1:])
+
+Return: int (the exit status)
+'''
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.count < 0:
+        print("--count must not be negative", file=sys.stderr)
+        return 2
+    box_length = math.isqrt(max(args.size, 0))
+    if args.size < 1 or box_length * box_length != args.size:
+        print("--size must be a perfect square: 4, 9, 16, 25, ...", file=sys.stderr)
+        return 2
+    try:
+        check_removed(args.size, args.holes, args.unique)
+    except ValueError as error:
+        print("--holes: " + str(error), file=sys.stderr)
+        return 2
+    if args.format == "corpus" and args.output == "-":
+        print("--format corpus needs a file to write to (-o)", file=sys.stderr)
+        return 2
+    if args.dedup is not None and args.size > 9:
+        print("--dedup only supports boards up to 9x9", file=sys.stderr)
+        return 2
+    if args.dedup is not None:
+        # needs NumPy, like --dedup itself
+        from sudoku_canonical import MAX_HOLES
+        if args.holes > MAX_HOLES.get(args.size, 0):
+            print("--dedup supports at most " + str(MAX_HOLES.get(args.size, 0)) + " holes on " +
+                  str(args.size) + "x" + str(args.size) + " boards", file=sys.stderr)
+            return 2
+
+    if args.metrics is not None:
+        sudoku_metrics.enable()
+    start = time.perf_counter()
+    puzzles = generate_sudoku_batch(args.count, args.holes, workers=args.workers or None, size=args.size,
+                                    unique=args.unique, mode=args.mode, seed=args.seed)
+    index = None
+    if args.dedup is not None:
+        # needs NumPy, so only imported when --dedup is used
+        from sudoku_canonical import DedupIndex
+        index = DedupIndex(args.dedup or None)
+        puzzles = index.filter(puzzles)
+    try:
+        return write_puzzles(args, puzzles, start)
+    except ValueError as error:
+        # generation gave up, e.g. no unique puzzle found with that many holes
+        print(error, file=sys.stderr)
+        return 1
+    finally:
+        if index is not None:
+            index.close()
+        if args.metrics is not None:
+            sudoku_metrics.registry.write(args.metrics)
+
+
+'''
+Writes the generated puzzles out in the chosen format
+
+Parameters:
+args is the parsed command line
+puzzles is an iterable of (puzzle, solution) pairs
+start is the time.perf_counter() value when generation started
+
+Return: int (the exit status)
+'''
+
+
+def write_puzzles(args, puzzles, start):
+    if args.rate:
+        puzzles = rate_stream(puzzles)
+    else:
+        puzzles = ((puzzle, solution, None) for puzzle, solution in puzzles)
+    if args.format == "corpus":
+        with CorpusWriter(args.output, args.size) as writer:
+            for puzzle, solution, rating in puzzles:
+                writer.add(puzzle, solution, rating or 0)
+        written = writer.count
+        if args.stats:
+            print_stats(written, start)
+        return 0
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    written = 0
+    try:
+        for puzzle, solution, rating in puzzles:
+            out.write(format_puzzle(puzzle, solution, args.format, rating) + "\n")
+            written += 1
+        out.flush()
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into head) - not an error for a stream,
+        # but stdout has to be pointed somewhere harmless so its final flush is quiet
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.stats:
+        print_stats(written, start)
+    return 0
+
+
+'''
+Prints the --stats summary to stderr
+
+Parameters:
+written is the number of puzzles generated
+start is the time.perf_counter() value when generation started
+
+Return: None
+'''
+
+
+def print_stats(written, start):
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else 0.0
+    print("%d puzzles in %.2f s (%.1f puzzles/s)" % (written, elapsed, rate), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
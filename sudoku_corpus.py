@@ -0,0 +1,273 @@
+import mmap, os, random, shutil, struct, tempfile
+from sudoku_generator import CompactBoard
+
+"""
+Binary puzzle bank with O(1) random access
+
+File layout (all integers little-endian):
+    header      HEADER - magic, version, board size, index length, record count,
+                and the byte offsets of the index and of the first record
+    index       one INDEX_ENTRY per hole count: holes, first record, number of records
+    records     fixed-size records sorted by hole count: the puzzle (N*N bytes), the
+                solution (N*N bytes), then RECORD_META - holes, rating, and seed
+
+Every record has the same size, so record i is at records_offset + i * record_size
+and a reader can hand it out straight from a memory map without parsing anything.
+A rating or seed of 0 means it was not recorded.
+
+"""
+
+MAGIC = b"SUDOKUC1"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQQQ")
+INDEX_ENTRY = struct.Struct("<IQQ")
+RECORD_META = struct.Struct("<HHQ")
+
+
+class CorpusWriter:
+    '''
+    writes a puzzle bank file one puzzle at a time
+    This should initialize:
+    self.path			- the file to write
+    self.size			- the number of rows/columns of every puzzle
+    self.count			- the number of puzzles added so far
+    self.closed			- True once close() has written the file
+
+    Puzzles arrive in any order but are stored grouped by hole count, so each group
+    goes to its own temporary file until close() joins them behind the header and
+    index. Memory use does not grow with the number of puzzles.
+
+    Parameters:
+    path is the file to write
+    size is the number of rows/columns of every puzzle
+
+    Return:
+    None
+    '''
+
+    def __init__(self, path, size=9):
+        self.path = path
+        self.size = size
+        self.count = 0
+        self.groups = {}
+        self.closed = False
+
+    '''
+    Adds one puzzle to the bank
+
+	Parameters:
+	puzzle and solution are 2D lists or CompactBoards
+	rating is an optional difficulty rating (0 to 65535, 0 for unrated)
+	seed is an optional 64-bit number the puzzle can be regenerated from (0 for none)
+
+	Return: None
+    '''
+
+    def add(self, puzzle, solution, rating=0, seed=0):
+        if self.closed:
+            raise ValueError("cannot add to a closed CorpusWriter")
+        if not isinstance(puzzle, CompactBoard):
+            puzzle = CompactBoard.from_board(puzzle)
+        if not isinstance(solution, CompactBoard):
+            solution = CompactBoard.from_board(solution)
+        if puzzle.size != self.size or solution.size != self.size:
+            raise ValueError("expected " + str(self.size) + "x" + str(self.size) + " boards")
+
+        holes = puzzle.data.count(0)
+        group = self.groups.get(holes)
+        if group is None:
+            group = tempfile.TemporaryFile()
+            self.groups[holes] = group
+        group.write(puzzle.data + solution.data + RECORD_META.pack(holes, rating, seed))
+        self.count += 1
+
+    '''
+    Writes the header, the index, and every record to the file
+    Only the first call writes anything, so closing twice leaves the file intact
+
+	Parameters: None
+	Return: None
+    '''
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        holes_list = sorted(self.groups)
+        index_offset = HEADER.size
+        records_offset = index_offset + INDEX_ENTRY.size * len(holes_list)
+        record_size = 2 * self.size * self.size + RECORD_META.size
+
+        with open(self.path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, self.size, len(holes_list), self.count,
+                                  index_offset, records_offset))
+            start = 0
+            for holes in holes_list:
+                count = self.groups[holes].tell() // record_size
+                out.write(INDEX_ENTRY.pack(holes, start, count))
+                start += count
+            for holes in holes_list:
+                group = self.groups[holes]
+                group.seek(0)
+                shutil.copyfileobj(group, out)
+                group.close()
+        self.groups = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            for group in self.groups.values():
+                group.close()
+            self.groups = {}
+            self.closed = True
+
+
+class CorpusReader:
+    '''
+    memory-maps a puzzle bank written by CorpusWriter
+    This should initialize:
+    self.size			- the number of rows/columns of every puzzle
+    self.count			- the number of puzzles in the file
+    self.index			- a dict of hole count -> (first record, number of records)
+
+    Only the header and index are read up front. Records are read from the memory map
+    when asked for, so opening even a very large bank is instant.
+
+    CorpusReader has a get(difficulty) method, so it can be passed to Board as its
+    puzzle source in place of live generation.
+
+    Parameters:
+    path is the file to read
+
+    Return:
+    None
+    '''
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = None
+        try:
+            self.read_header(path)
+        except ValueError:
+            self.close()
+            raise
+        except struct.error:
+            # the index runs past the end of the file
+            self.close()
+            raise ValueError(str(path) + " has a cut-off index")
+
+    '''
+    Maps the file and reads its header and index, see __init__
+    Raises ValueError (or struct.error for a cut-off index) if the file is not a whole bank
+
+	Parameters:
+	path is the file being read, for error messages
+
+	Return: None
+    '''
+
+    def read_header(self, path):
+        # mmap cannot map an empty file, so the length is checked before mapping
+        if os.fstat(self.file.fileno()).st_size < HEADER.size:
+            raise ValueError(str(path) + " is too short to be a puzzle bank")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, index_count, count, index_offset, records_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(str(path) + " is not a version " + str(VERSION) + " puzzle bank")
+
+        self.size = size
+        self.count = count
+        self.cells = size * size
+        self.record_size = 2 * self.cells + RECORD_META.size
+        self.records_offset = records_offset
+        if records_offset + count * self.record_size > len(self.map):
+            raise ValueError(str(path) + " is missing records")
+        self.index = {}
+        for i in range(index_count):
+            holes, start, length = INDEX_ENTRY.unpack_from(self.map, index_offset + i * INDEX_ENTRY.size)
+            self.index[holes] = (start, length)
+
+    def __len__(self):
+        return self.count
+
+    '''
+    Returns record i
+
+	Parameters:
+	i is the record number (0 to len - 1)
+
+	Return: (CompactBoard, CompactBoard, int, int, int) - puzzle, solution, holes, rating, seed
+    '''
+
+    def record(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError("record " + str(i) + " out of range")
+        offset = self.records_offset + i * self.record_size
+        puzzle = CompactBoard(self.map[offset:offset + self.cells], self.size)
+        solution = CompactBoard(self.map[offset + self.cells:offset + 2 * self.cells], self.size)
+        holes, rating, seed = RECORD_META.unpack_from(self.map, offset + 2 * self.cells)
+        return puzzle, solution, holes, rating, seed
+
+    '''
+    Returns the range of record numbers holding puzzles with the given number of holes
+
+	Parameters:
+	holes is the number of empty cells
+
+	Return: range (empty if there are none)
+    '''
+
+    def records_with(self, holes):
+        start, length = self.index.get(holes, (0, 0))
+        return range(start, start + length)
+
+    '''
+    Returns a random puzzle for Board
+    If the bank has no puzzles with exactly difficulty holes, the closest hole count is used
+
+	Parameters:
+	difficulty is the number of cells removed
+
+	Return: list[list]
+    '''
+
+    def get(self, difficulty):
+        if not self.index:
+            raise LookupError("the puzzle bank is empty")
+        holes = min(self.index, key=lambda h: abs(h - difficulty))
+        start, length = self.index[holes]
+        return self.record(start + random.randrange(length))[0].to_board()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+'''
+Writes every puzzle from an iterable, e.g. generate_sudoku_batch, into a new puzzle bank
+
+Parameters:
+path is the file to write
+puzzles is an iterable of (puzzle, solution) pairs
+size is the number of rows/columns of every puzzle
+
+Return: int (the number of puzzles written)
+'''
+
+
+def write_corpus(path, puzzles, size=9):
+    with CorpusWriter(path, size) as writer:
+        for puzzle, solution in puzzles:
+            writer.add(puzzle, solution)
+    return writer.count
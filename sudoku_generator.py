@@ -1,4 +1,5 @@
-import math, random, pygame
+import functools, math, os, queue, random, threading
+import sudoku_metrics
 
 """
 This was adapted from a GeeksforGeeks article "Program for Sudoku Generator" by Aarti_Rathi and Ankur Trisal
@@ -6,6 +7,39 @@ https://www.geeksforgeeks.org/program-sudoku-generator/
 
 """
 
+'''
+Solved grids that fill_transformed derives new grids from, keyed by row_length
+A size with no entry gets one grid from fill_values the first time it is needed.
+Append your own solved grids to widen the pool
+'''
+seed_grids = {}
+
+'''
+fill_transformed also adds a new grid from fill_values to the pool for about one grid
+in SEED_GRID_EVERY, until the pool holds SEED_GRID_LIMIT grids. Every grid in the pool
+starts a new symmetry class, so a long run keeps getting more varied
+'''
+SEED_GRID_EVERY = 16
+SEED_GRID_LIMIT = 1024
+
+'''
+Characters used for cell values in one-line boards (board_to_string), 0 being empty
+'''
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+'''
+Fewest given cells a puzzle with a unique solution can have, by row_length (proven for
+4x4 and 9x9). Other sizes use row_length - 1: with two digits missing from the givens,
+swapping them in any solution gives a second one
+'''
+MIN_UNIQUE_CLUES = {4: 4, 9: 17}
+
+'''
+Number of solutions generate_sudoku_with_solution builds for one unique puzzle before
+giving up - near the hole limit most of them get stuck before enough cells are removed
+'''
+MAX_UNIQUE_ATTEMPTS = 1000
+
 
 class SudokuGenerator:
     '''
@@ -15,19 +49,27 @@ class SudokuGenerator:
     self.removed_cells	- the total number of cells to be removed
     self.board			- a 2D list of ints to represent the board
     self.box_length		- the square root of row_length
+    self.rng			- the random.Random that every random choice is drawn from
 
     Parameters:
-    row_length is the number of rows/columns of the board (always 9 for this project)
+    row_length is the number of rows/columns of the board (a perfect square: 9, 16, 25, ...)
     removed_cells is an integer value - the number of cells to be removed
+    rng is an optional int seed or random.Random - the same seed always gives the same board
+    (default: a fresh random.Random seeded by the OS, never the global random module)
 
     Return:
     None
     '''
 
-    def __init__(self, row_length, removed_cells):
+    def __init__(self, row_length, removed_cells, rng=None):
         self.row_length = row_length
         self.removed_cells = removed_cells
         self.box_length = int(math.sqrt(self.row_length))
+        if row_length < 1 or self.box_length * self.box_length != row_length:
+            raise ValueError("row_length must be a perfect square (4, 9, 16, ...), not " + str(row_length))
+        if not isinstance(rng, random.Random):
+            rng = random.Random(rng)
+        self.rng = rng
         self.board = []
 
         for i in range(self.row_length):
@@ -36,6 +78,11 @@ class SudokuGenerator:
                 row.append(0)
             self.board.append(row)
 
+        # occupancy bitmasks - bit n is set when digit n is used in that row/col/box
+        self.row_masks = [0] * self.row_length
+        self.col_masks = [0] * self.row_length
+        self.box_masks = [0] * self.row_length
+
     '''
 	Returns a 2D python list of numbers which represents the board
 
@@ -55,13 +102,14 @@ class SudokuGenerator:
     '''
 
     def print_board(self):
+        width = len(str(self.row_length))
         for row in self.board:
             line = ""
             for num in row:
                 if num != 0:
-                    line += str(num) + " "
+                    line += str(num).rjust(width) + " "
                 else:
-                    line += ". "
+                    line += ".".rjust(width) + " "
             print(line)
 
     '''
@@ -76,10 +124,7 @@ class SudokuGenerator:
     '''
 
     def valid_in_row(self, row, num):
-        for col in range(self.row_length):
-            if self.board[row][col] == num:
-                return False
-        return True
+        return not self.row_masks[row] & (1 << num)
 
     '''
 	Determines if num is contained in the specified column (vertical) of the board
@@ -93,30 +138,23 @@ class SudokuGenerator:
     '''
 
     def valid_in_col(self, col, num):
-        for row in range(self.row_length):
-            if self.board[row][col] == num:
-                return False
-        return True
+        return not self.col_masks[col] & (1 << num)
 
     '''
-	Determines if num is contained in the 3x3 box specified on the board
+	Determines if num is contained in the box specified on the board
     If num is in the specified box starting at (row_start, col_start), return False.
     Otherwise, return True
 
 	Parameters:
 	row_start and col_start are the starting indices of the box to check
-	i.e. the box is from (row_start, col_start) to (row_start+2, col_start+2)
+	i.e. the box is from (row_start, col_start) to (row_start+box_length-1, col_start+box_length-1)
 	num is the value we are looking for in the box
 
 	Return: boolean
     '''
 
     def valid_in_box(self, row_start, col_start, num):
-        for r in range(row_start, row_start + 3):
-            for c in range(col_start, col_start + 3):
-                if self.board[r][c] == num:
-                    return False
-        return True
+        return not self.box_masks[self.box_index(row_start, col_start)] & (1 << num)
 
     '''
     Determines if it is valid to enter num at (row, col) in the board
@@ -130,38 +168,75 @@ class SudokuGenerator:
     '''
 
     def is_valid(self, row, col, num):
-        row_valid = self.valid_in_row(row, num)
-        col_valid = self.valid_in_col(col, num)
-        box_valid = self.valid_in_box(row - row % 3, col - col % 3, num)
-        return row_valid and col_valid and box_valid
+        used = self.row_masks[row] | self.col_masks[col] | self.box_masks[self.box_index(row, col)]
+        return not used & (1 << num)
+
+    '''
+    Returns the index (0 to row_length - 1) of the box containing (row, col)
+    Boxes are numbered left to right, top to bottom
+
+	Parameters:
+	row and col are the row index and col index of a cell in the board
 
+	Return: int
+    '''
+
+    def box_index(self, row, col):
+        return (row // self.box_length) * self.box_length + col // self.box_length
+
+    '''
+    Writes num into (row, col) and keeps the row, column, and box bitmasks in sync
+    Writing 0 clears the cell. All writes to self.board should go through here
+
+	Parameters:
+	row and col are the row index and col index of the cell to write
+	num is the value to write (0 for empty)
+
+	Return: None
     '''
-    Fills the specified 3x3 box with values
+
+    def set_value(self, row, col, num):
+        box = self.box_index(row, col)
+        old = self.board[row][col]
+        if old != 0:
+            bit = ~(1 << old)
+            self.row_masks[row] &= bit
+            self.col_masks[col] &= bit
+            self.box_masks[box] &= bit
+        if num != 0:
+            bit = 1 << num
+            self.row_masks[row] |= bit
+            self.col_masks[col] |= bit
+            self.box_masks[box] |= bit
+        self.board[row][col] = num
+
+    '''
+    Fills the specified box with values
     For each position, generates a random digit which has not yet been used in the box
 
 	Parameters:
 	row_start and col_start are the starting indices of the box to check
-	i.e. the box is from (row_start, col_start) to (row_start+2, col_start+2)
+	i.e. the box is from (row_start, col_start) to (row_start+box_length-1, col_start+box_length-1)
 
 	Return: None
     '''
 
     def fill_box(self, row_start, col_start):
         nums = []
-        for i in range(1, 10):
+        for i in range(1, self.row_length + 1):
             nums.append(i)
 
-        random.shuffle(nums)
+        self.rng.shuffle(nums)
 
         index = 0
-        for r in range(3):
-            for c in range(3):
-                self.board[row_start + r][col_start + c] = nums[index]
+        for r in range(self.box_length):
+            for c in range(self.box_length):
+                self.set_value(row_start + r, col_start + c, nums[index])
                 index += 1
 
     '''
     Fills the three boxes along the main diagonal of the board
-    These are the boxes which start at (0,0), (3,3), and (6,6)
+    For a 9x9 board these are the boxes which start at (0,0), (3,3), and (6,6)
 
 	Parameters: None
 	Return: None
@@ -172,57 +247,175 @@ class SudokuGenerator:
             self.fill_box(i, i)
 
     '''
-    DO NOT CHANGE
-    Provided for students
     Fills the remaining cells of the board
     Should be called after the diagonal boxes have been filled
 
+    Backtracking uses an explicit stack instead of recursion, so 16x16 and 25x25
+    boards cannot hit the recursion limit. At each step it fills the empty cell
+    with the fewest candidates left, which keeps the search tree small.
+
 	Parameters:
 	row, col specify the coordinates of the first empty (0) cell
+	(kept for compatibility - every empty cell is filled regardless)
+	limit is the number of backtracks after which to give up (None for no limit)
 
 	Return:
 	boolean (whether or not we could solve the board)
     '''
 
-    def fill_remaining(self, row, col):
-        if (col >= self.row_length and row < self.row_length - 1):
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
-            return True
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == int(row // self.box_length * self.box_length):
-                col += self.box_length
-        else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
-
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
-                    return True
-                self.board[row][col] = 0
-        return False
-
-    '''
-    DO NOT CHANGE
-    Provided for students
+    def fill_remaining(self, row, col, limit=None):
+        full = ((1 << (self.row_length + 1)) - 1) & ~1
+        empty = []
+        for r in range(self.row_length):
+            for c in range(self.row_length):
+                if self.board[r][c] == 0:
+                    empty.append((r, c, self.box_index(r, c)))
+        total = len(empty)
+
+        # stack[depth] holds the candidates not yet tried for empty[depth]
+        stack = []
+        free = None
+        backtracks = 0
+        while len(stack) < total:
+            depth = len(stack)
+            if free is None:
+                best = depth
+                best_count = self.row_length + 1
+                for i in range(depth, total):
+                    r, c, box = empty[i]
+                    candidates = full & ~(self.row_masks[r] | self.col_masks[c] | self.box_masks[box])
+                    count = candidates.bit_count()
+                    if count < best_count:
+                        best = i
+                        free = candidates
+                        best_count = count
+                        if count <= 1:
+                            break
+                empty[depth], empty[best] = empty[best], empty[depth]
+
+            if free:
+                bit = free & -free
+                row, col, box = empty[depth]
+                self.set_value(row, col, bit.bit_length() - 1)
+                stack.append(free ^ bit)
+                free = None
+            else:
+                if not stack or limit == 0:
+                    if sudoku_metrics.enabled:
+                        self.record_search(len(stack), backtracks)
+                    return False
+                if limit is not None:
+                    limit -= 1
+                backtracks += 1
+                free = stack.pop()
+                row, col, box = empty[depth - 1]
+                self.set_value(row, col, 0)
+        if sudoku_metrics.enabled:
+            self.record_search(total, backtracks)
+        return True
+
+    '''
+    Adds the work done by one fill_remaining search to the metrics
+    Every undone placement was also made once, so the cells placed are the ones still
+    on the board plus the backtracks
+
+	Parameters:
+	placed is the number of cells the search left filled
+	backtracks is the number of placements it undid
+
+	Return: None
+    '''
+
+    def record_search(self, placed, backtracks):
+        sudoku_metrics.registry.add("sudoku_fill_remaining_nodes_total", placed + backtracks)
+        sudoku_metrics.registry.add("sudoku_fill_remaining_backtracks_total", backtracks)
+
+    '''
     Constructs a solution by calling fill_diagonal and fill_remaining
+    A search that backtracks too often is abandoned and restarted from a new
+    diagonal, which cuts off the rare very slow searches on 16x16 and 25x25 boards
 
 	Parameters: None
 	Return: None
     '''
 
     def fill_values(self):
-        self.fill_diagonal()
-        self.fill_remaining(0, self.box_length)
+        with sudoku_metrics.phase("fill_diagonal"):
+            self.fill_diagonal()
+        while True:
+            with sudoku_metrics.phase("fill_remaining"):
+                filled = self.fill_remaining(0, self.box_length, 4 * self.row_length * self.row_length)
+            if filled:
+                break
+            if sudoku_metrics.enabled:
+                sudoku_metrics.registry.add("sudoku_fill_restarts_total")
+            self.clear_board()
+            with sudoku_metrics.phase("fill_diagonal"):
+                self.fill_diagonal()
+
+    '''
+    Constructs a solution by transforming an existing solved grid instead of searching
+    Relabels the digits, shuffles the rows inside each band, the bands, the columns
+    inside each stack, and the stacks, and transposes half the time. All of these
+    keep a solved grid solved, so this is a drop-in for fill_values at a fraction of
+    the cost. The new grid is in the same symmetry class as the grid it came from, so
+    the pool is grown now and then (see SEED_GRID_EVERY) to keep adding new classes.
+
+	Parameters:
+	grid is an optional solved 2D list to transform (default: a random grid from the pool)
+	bank is an optional list of solved grids to use as the pool instead of seed_grids
+
+	Return: None
+    '''
+
+    def fill_transformed(self, grid=None, bank=None):
+        n = self.row_length
+        k = self.box_length
+        if grid is None:
+            if bank is None:
+                bank = seed_grids.setdefault(n, [])
+            if not bank or (len(bank) < SEED_GRID_LIMIT and self.rng.randrange(SEED_GRID_EVERY) == 0):
+                seed = SudokuGenerator(n, 0, self.rng)
+                seed.fill_values()
+                bank.append(seed.get_board())
+            grid = self.rng.choice(bank)
+
+        digits = list(range(1, n + 1))
+        self.rng.shuffle(digits)
+        digits.insert(0, 0)
+
+        rows = []
+        cols = []
+        for order in (rows, cols):
+            bands = list(range(k))
+            self.rng.shuffle(bands)
+            for band in bands:
+                lines = list(range(band * k, band * k + k))
+                self.rng.shuffle(lines)
+                order.extend(lines)
+
+        if self.rng.random() < 0.5:
+            self.board = [[digits[grid[c][r]] for c in cols] for r in rows]
+        else:
+            self.board = [[digits[grid[r][c]] for c in cols] for r in rows]
+
+        # every row, column, and box of a solved grid uses every digit
+        full = ((1 << (n + 1)) - 1) & ~1
+        self.row_masks = [full] * n
+        self.col_masks = [full] * n
+        self.box_masks = [full] * n
+
+    '''
+    Empties every cell of the board
+
+	Parameters: None
+	Return: None
+    '''
+
+    def clear_board(self):
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                self.set_value(row, col, 0)
 
     '''
     Removes the appropriate number of cells from the board
@@ -233,23 +426,148 @@ class SudokuGenerator:
     NOTE: Be careful not to 'remove' the same cell multiple times
     i.e. if a cell is already 0, it cannot be removed again
 
-	Parameters: None
-	Return: None
+    With unique=True a cell is only removed if the puzzle still has exactly one
+    solution afterwards. Cells whose digit is forced by their row, column, and box
+    are removed first because they need no search at all; the rest are checked
+    with count_solutions. If a removal would allow a second solution the cell is
+    kept for good, since removing more cells can never bring uniqueness back.
+
+	Parameters:
+	unique is a boolean - whether every removal must keep the solution unique
+
+	Return:
+	boolean (whether removed_cells cells could be removed)
     '''
 
-    def remove_cells(self):
+    def remove_cells(self, unique=False):
+        if unique:
+            return self.remove_cells_unique()
+
         count = 0
         while count < self.removed_cells:
-            row = random.randint(0, 8)
-            col = random.randint(0, 8)
+            row = self.rng.randint(0, self.row_length - 1)
+            col = self.rng.randint(0, self.row_length - 1)
             if self.board[row][col] != 0:
-                self.board[row][col] = 0
+                self.set_value(row, col, 0)
                 count += 1
+        return True
+
+    '''
+    Unique-solution version of remove_cells, see remove_cells above
+
+	Parameters: None
+	Return:
+	boolean (whether removed_cells cells could be removed)
+    '''
+
+    def remove_cells_unique(self):
+        full = ((1 << (self.row_length + 1)) - 1) & ~1
+        candidates = []
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if self.board[row][col] != 0:
+                    candidates.append((row, col, self.box_index(row, col)))
+        self.rng.shuffle(candidates)
+
+        count = 0
+        while count < self.removed_cells and candidates:
+            # pick the cell with the fewest other digits that could replace it
+            best = 0
+            best_free = self.row_length + 1
+            for i in range(len(candidates)):
+                row, col, box = candidates[i]
+                free = (full & ~(self.row_masks[row] | self.col_masks[col] | self.box_masks[box])).bit_count()
+                if free < best_free:
+                    best = i
+                    best_free = free
+                    if free == 0:
+                        break
+
+            row, col, box = candidates.pop(best)
+            num = self.board[row][col]
+            self.set_value(row, col, 0)
+            if best_free != 0 and self.count_solutions(1, (row, col, num)) != 0:
+                self.set_value(row, col, num)
+            else:
+                count += 1
+        return count == self.removed_cells
+
+    '''
+    Counts the solutions of the current board, stopping as soon as limit is reached
+    Uses the bitmasks to find candidates and always branches on the empty cell with
+    the fewest candidates. The board itself is left unchanged
+
+	Parameters:
+	limit is the number of solutions after which counting stops (2 is enough to test uniqueness)
+	exclude is an optional (row, col, num) - only count solutions where (row, col) is not num
+
+	Return: int (the number of solutions found, at most limit)
+    '''
+
+    def count_solutions(self, limit=2, exclude=None):
+        full = ((1 << (self.row_length + 1)) - 1) & ~1
+        rows = self.row_masks[:]
+        cols = self.col_masks[:]
+        boxes = self.box_masks[:]
+        empty = []
+        banned = []
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if self.board[row][col] == 0:
+                    empty.append((row, col, self.box_index(row, col)))
+                    if exclude is not None and exclude[0] == row and exclude[1] == col:
+                        banned.append(1 << exclude[2])
+                    else:
+                        banned.append(0)
+        total = len(empty)
+
+        # limit is the number of solutions still wanted from this branch, so the
+        # search stops as soon as the whole board has reached the caller's limit
+        def search(depth, limit):
+            if depth == total:
+                return 1
+
+            # most constrained cell first, swapped into position depth
+            best = depth
+            best_free = 0
+            best_count = self.row_length + 1
+            for i in range(depth, total):
+                row, col, box = empty[i]
+                free = full & ~(rows[row] | cols[col] | boxes[box] | banned[i])
+                free_count = free.bit_count()
+                if free_count < best_count:
+                    best = i
+                    best_free = free
+                    best_count = free_count
+                    if free_count <= 1:
+                        break
+            if best_count == 0:
+                return 0
+            empty[depth], empty[best] = empty[best], empty[depth]
+            banned[depth], banned[best] = banned[best], banned[depth]
+
+            row, col, box = empty[depth]
+            found = 0
+            while best_free:
+                bit = best_free & -best_free
+                best_free ^= bit
+                rows[row] |= bit
+                cols[col] |= bit
+                boxes[box] |= bit
+                found += search(depth + 1, limit - found)
+                rows[row] ^= bit
+                cols[col] ^= bit
+                boxes[box] ^= bit
+                if found >= limit:
+                    break
+            return found
+
+        if limit <= 0:
+            return 0
+        return search(0, limit)
 
 
 '''
-DO NOT CHANGE
-Provided for students
 Given a number of rows and number of cells to remove, this function:
 1. creates a SudokuGenerator
 2. fills its values and saves this as the solved state
@@ -257,346 +575,484 @@ Given a number of rows and number of cells to remove, this function:
 4. returns the representative 2D Python Lists of the board and solution
 
 Parameters:
-size is the number of rows/columns of the board (9 for this project)
+size is the number of rows/columns of the board (9, 16, 25, ...)
 removed is the number of cells to clear (set to 0)
+unique is a boolean - if True the puzzle is guaranteed to have exactly one solution
+(a new solution is generated whenever the removal gets stuck before removed cells,
+and ValueError is raised after MAX_UNIQUE_ATTEMPTS of them)
+mode is how the solution is built - "backtrack" (fill_values) or "transform" (fill_transformed)
+rng is an optional int seed or random.Random, see SudokuGenerator
+(with mode "transform" the result also depends on what is already in seed_grids)
+bank is an optional list of solved grids for mode "transform" to use instead of seed_grids
 
 Return: list[list] (a 2D Python list to represent the board)
 '''
 
 
-def generate_sudoku(size, removed):
-    sudoku = SudokuGenerator(size, removed)
-    sudoku.fill_values()
-    board = sudoku.get_board()
-    sudoku.remove_cells()
-    board = sudoku.get_board()
+def generate_sudoku(size, removed, unique=False, mode="backtrack", rng=None, bank=None):
+    board, solution = generate_sudoku_with_solution(size, removed, unique, mode, rng, bank)
     return board
 
 
-# Cell Class
-
-class Cell:
-
-    # Cell class iniz
-    # getting the value of the cell, the position, and which screen should be displayed
-    # also whether or not the cell is selected to be changed
-    def __init__(self, value, row, col, screen):
-        self.value = value
-        self.row = row
-        self.col = col
-        self.screen = screen
-        self.selected = False
-        self.tempValue = 0
-
-    # setting a cells value
-    def set_cell_value(self, value):
-        self.value = value
-
-    # Temp value of a cell
-    def set_sketched_value(self, value):
-        self.tempValue = value
-
-    # drawing the cell
-    def draw(self):
-
-        # size of cell
-        cell_width = 540 // 9
-        cell_height = 540 // 9
-        x = self.col * cell_width
-        y = self.row * cell_height
-
-        # Font of game
-        font = pygame.font.SysFont("arial", 30)
-
-        # value of cell. Actual or sketched
-        if self.value != 0:
-            text = font.render(str(self.value), True, (0, 0, 0))
-            text_rect = text.get_rect(center=(x + cell_width // 2, y + cell_height // 2))
-            self.screen.blit(text, text_rect)
-        elif self.tempValue != 0:
-            sketchFont = pygame.font.SysFont("arial", 15)
-            sketchText = sketchFont.render(str(self.tempValue), True, (0, 0, 0))
-            self.screen.blit(sketchText, (x + cell_width // 2, y + cell_height // 2))
-
-        # selected cell drawing
-        if self.selected:
-            pygame.draw.rect(self.screen, (255, 0, 0), (x, y, cell_width, cell_height), 3)
+'''
+Same as generate_sudoku, but also returns the solved board the puzzle came from
+
+Parameters: see generate_sudoku
+
+Return: (list[list], list[list]) - the puzzle and its solution
+'''
+
+
+def generate_sudoku_with_solution(size, removed, unique=False, mode="backtrack", rng=None, bank=None):
+    if mode not in ("backtrack", "transform"):
+        raise ValueError("unknown mode: " + str(mode))
+    check_removed(size, removed, unique)
+    # one stream for every attempt, so retries stay reproducible too
+    if not isinstance(rng, random.Random):
+        rng = random.Random(rng)
+
+    attempts = 0
+    while True:
+        sudoku = SudokuGenerator(size, removed, rng)
+        if mode == "transform":
+            with sudoku_metrics.phase("fill_transformed"):
+                sudoku.fill_transformed(bank=bank)
         else:
-            pygame.draw.rect(self.screen, (0, 0, 0), (x, y, cell_width, cell_height), 1)
-
-
-class Board:
-    def __init__(self, width, height, screen, difficulty):
-        self.width = width
-        self.height = height
-        self.screen = screen
-        self.difficulty = difficulty
-        self.selected_cell = None
-        self.board_values = generate_sudoku(9, difficulty)
-        self.original_board = [row[:] for row in self.board_values]
-        self.cells = []
-        for row in range(9):
-            row_cells = []
-            for col in range(9):
-                value = self.board_values[row][col]
-                cell = Cell(value, row, col, screen)
-                row_cells.append(cell)
-            self.cells.append(row_cells)
-
-    def draw(self):
-        self.screen.fill((255, 255, 255))
-        for i in range(10):
-            line_thickness = 4 if i % 3 == 0 else 1
-            pygame.draw.line(self.screen, (0, 0, 0), (0, i * self.height // 9), (self.width, i * self.height // 9),
-                             line_thickness)
-            pygame.draw.line(self.screen, (0, 0, 0), (i * self.width // 9, 0), (i * self.width // 9, self.height),
-                             line_thickness)
-
-        for row in self.cells:
-            for cell in row:
-                cell.draw()
-
-    def select(self, row, col):
-        if self.selected_cell:
-            self.selected_cell.selected = False
-        self.selected_cell = self.cells[row][col]
-        self.selected_cell.selected = True
-
-    def click(self, x, y):
-        if 0 <= x < self.width and 0 <= y < self.height:
-            row = y // (self.height // 9)
-            col = x // (self.width // 9)
-            return row, col
-        return None
-
-    def clear(self):
-        if self.selected_cell and self.original_board[self.selected_cell.row][self.selected_cell.col] == 0:
-            self.selected_cell.set_cell_value(0)
-            self.selected_cell.set_sketched_value(0)
-
-    def sketch(self, value):
-        if self.selected_cell:
-            self.selected_cell.set_sketched_value(value)
-
-    def place_number(self, value):
-        if self.selected_cell and self.original_board[self.selected_cell.row][self.selected_cell.col] == 0:
-            self.selected_cell.set_cell_value(value)
-            self.update_board()
-
-    def reset_to_original(self):
-        for row in range(9):
-            for col in range(9):
-                self.cells[row][col].set_cell_value(self.original_board[row][col])
-                self.cells[row][col].set_sketched_value(0)
-
-    def is_full(self):
-        for row in self.cells:
-            for cell in row:
-                if cell.value == 0:
-                    return False
-        return True
+            sudoku.fill_values()
+        solution = [row[:] for row in sudoku.get_board()]
+        with sudoku_metrics.phase("remove_cells"):
+            removed_all = sudoku.remove_cells(unique)
+        if removed_all:
+            break
+        attempts += 1
+        if attempts == MAX_UNIQUE_ATTEMPTS:
+            raise ValueError("could not make a puzzle with a unique solution and " + str(removed) +
+                             " holes in " + str(attempts) + " attempts, try fewer holes")
+    board = sudoku.get_board()
+    return board, solution
 
-    def update_board(self):
-        self.board_values = []
-        for row in self.cells:
-            row_values = []
-            for cell in row:
-                row_values.append(cell.value)
-            self.board_values.append(row_values)
-
-    def find_empty(self):
-        for row in range(9):
-            for col in range(9):
-                if self.cells[row][col].value == 0:
-                    return row, col
-        return None
-
-    def check_board(self):
-        for row in range(9):
-            for col in range(9):
-                num = self.board_values[row][col]
-                if num == 0:
-                    return False
-                self.board_values[row][col] = 0
-                if not self.is_valid(row, col, num):
-                    return False
-                self.board_values[row][col] = num
-        return True
 
-    def is_valid(self, row, col, num):
+'''
+Checks that a puzzle with removed holes can be made, raising ValueError if not
 
-        for c in range(9):
-            if self.board_values[row][c] == num:
-                return False
+Parameters:
+size is the number of rows/columns of the board
+removed is the number of cells to clear
+unique is a boolean - whether the puzzle must have exactly one solution
 
-        for r in range(9):
-            if self.board_values[r][col] == num:
-                return False
+Return: None
+'''
 
-        box_row = row - row % 3
-        box_col = col - col % 3
-        for r in range(box_row, box_row + 3):
-            for c in range(box_col, box_col + 3):
-                if self.board_values[r][c] == num:
-                    return False
 
-        return True
+def check_removed(size, removed, unique=False):
+    if not 0 <= removed <= size * size:
+        raise ValueError("the number of holes must be between 0 and " + str(size * size) + ", not " +
+                         str(removed))
+    if unique:
+        most = size * size - MIN_UNIQUE_CLUES.get(size, size - 1)
+        if removed > most:
+            raise ValueError("a " + str(size) + "x" + str(size) + " puzzle with a unique solution has at most " +
+                             str(most) + " holes, not " + str(removed))
 
-    def draw_text_middle(self, screen, text, size, color):
-        font = pygame.font.SysFont("arial", size, bold=True)
-        label = font.render(text, True, color)
-        label_rect = label.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2))
-        screen.blit(label, label_rect)
-        pygame.display.update()
 
-    def draw_buttons(self):
-        font = pygame.font.SysFont("arial", 24)
-        button_width = 150
-        button_height = 40
+'''
+Generates count puzzles spread over a pool of worker processes
+Work is handed out in chunks of chunk_size puzzles. Every chunk gets its own RNG
+seed, drawn from seed, so workers never share random state and the same seed
+always produces the same set of chunks. Only a few chunks per worker are in
+flight at once, and each one is yielded as soon as it finishes, so memory use
+stays flat however large count is. Puzzles come back in completion order
+With mode "transform", every chunk starts from a copy of seed_grids[size] as it was
+when the batch started, and grows its copy on its own, so seed_grids is left alone
+and chunks do not depend on which ones a worker happened to run before
 
-        self.reset_button = pygame.Rect(30, 550, button_width, button_height)
-        self.new_game_button = pygame.Rect(195, 550, button_width, button_height)
-        self.exit_button = pygame.Rect(360, 550, button_width, button_height)
+Parameters:
+count is the number of puzzles to generate
+removed is the number of cells to clear in each puzzle
+workers is the number of processes (default: os.cpu_count(); 1 runs in this process)
+size, unique, and mode are passed to generate_sudoku_with_solution
+seed is an optional int that makes the batch reproducible
+chunk_size is the number of puzzles a worker builds per task
+
+Return: generator of (list[list], list[list]) - puzzle and solution pairs
+'''
 
-        pygame.draw.rect(self.screen, (200, 200, 200), self.reset_button)
-        pygame.draw.rect(self.screen, (200, 200, 200), self.new_game_button)
-        pygame.draw.rect(self.screen, (200, 200, 200), self.exit_button)
 
-        reset_text = font.render("Reset", True, (0, 0, 0))
-        new_game_text = font.render("New Game", True, (0, 0, 0))
-        exit_text = font.render("Exit", True, (0, 0, 0))
+def generate_sudoku_batch(count, removed, workers=None, size=9, unique=False, mode="backtrack", seed=None,
+                          chunk_size=64):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    seeds = random.Random(seed)
+    grids = ()
+    if mode == "transform":
+        grids = tuple(seed_grids.get(size, ()))
+
+    chunks = []
+    remaining = count
+    while remaining > 0:
+        chunks.append((size, removed, unique, mode, seeds.getrandbits(64), min(chunk_size, remaining), grids))
+        remaining -= chunk_size
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from generate_sudoku_chunk(*chunk)
+        return
+
+    # imported here so short-lived processes that never batch don't pay for multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        chunks.reverse()
+        while chunks or pending:
+            while chunks and len(pending) < 2 * workers:
+                pending.add(pool.submit(generate_sudoku_chunk, *chunks.pop()))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
 
-        self.screen.blit(reset_text, (self.reset_button.x + 35, self.reset_button.y + 7))
-        self.screen.blit(new_game_text, (self.new_game_button.x + 15, self.new_game_button.y + 7))
-        self.screen.blit(exit_text, (self.exit_button.x + 50, self.exit_button.y + 7))
 
+'''
+Worker task for generate_sudoku_batch - builds a chunk of puzzles from its own RNG
 
-    #static to show diffculty screen
-    def show_difficulty_screen(screen):
-        font = pygame.font.SysFont("arial", 40)
-        screen.fill((255, 255, 255))
+Parameters:
+size, removed, unique, and mode are passed to generate_sudoku_with_solution
+seed is the RNG seed for this chunk
+count is the number of puzzles to build
+grids is the solved grids the chunk's own pool for mode "transform" starts with
 
-        easy_button = pygame.Rect(170, 200, 200, 60)
-        medium_button = pygame.Rect(170, 300, 200, 60)
-        hard_button = pygame.Rect(170, 400, 200, 60)
+Return: list of (list[list], list[list]) - puzzle and solution pairs
+'''
 
-        pygame.draw.rect(screen, (0, 200, 0), easy_button)
-        pygame.draw.rect(screen, (255, 165, 0), medium_button)
-        pygame.draw.rect(screen, (200, 0, 0), hard_button)
 
-        screen.blit(font.render("Easy", True, (0, 0, 0)), (235, 210))
-        screen.blit(font.render("Medium", True, (0, 0, 0)), (215, 310))
-        screen.blit(font.render("Hard", True, (0, 0, 0)), (235, 410))
+def generate_sudoku_chunk(size, removed, unique, mode, seed, count, grids=()):
+    rng = random.Random(seed)
+    bank = list(grids)
+    puzzles = []
+    for i in range(count):
+        puzzles.append(generate_sudoku_with_solution(size, removed, unique, mode, rng, bank))
+    return puzzles
 
-        pygame.display.update()
 
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    quit()
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    x, y = pygame.mouse.get_pos()
-                    if easy_button.collidepoint(x, y):
-                        return 30
-                    elif medium_button.collidepoint(x, y):
-                        return 40
-                    elif hard_button.collidepoint(x, y):
-                        return 50
-
-
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((540, 600))
-    pygame.display.set_caption("Sudoku")
-
-    difficulty = Board.show_difficulty_screen(screen)
-    board = Board(540, 540, screen, difficulty)
-    clock = pygame.time.Clock()
-    running = True
-    game_over = False
-    won = False
-
-    while running:
-        screen.fill((255, 255, 255))  # Clear screen each frame
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-            if not game_over:
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
-                    if mouse_y < 540:  # only click inside board
-                        clicked = board.click(mouse_x, mouse_y)
-                        if clicked:
-                            row, col = clicked
-                            board.select(row, col)
-                    else:
-                        if board.reset_button.collidepoint((mouse_x, mouse_y)):
-                            board.reset_to_original()
-                        if board.new_game_button.collidepoint((mouse_x, mouse_y)):
-                            board = Board(540, 540, screen, difficulty)
-                            board.draw_buttons()
-                            game_over = False
-                            won = False
-                        if board.exit_button.collidepoint((mouse_x, mouse_y)):
-                            running = False
-
-                elif event.type == pygame.KEYDOWN:
-                    if board.selected_cell:
-                        if event.key in (pygame.K_1, pygame.K_KP1):
-                            board.sketch(1)
-                        if event.key in (pygame.K_2, pygame.K_KP2):
-                            board.sketch(2)
-                        if event.key in (pygame.K_3, pygame.K_KP3):
-                            board.sketch(3)
-                        if event.key in (pygame.K_4, pygame.K_KP4):
-                            board.sketch(4)
-                        if event.key in (pygame.K_5, pygame.K_KP5):
-                            board.sketch(5)
-                        if event.key in (pygame.K_6, pygame.K_KP6):
-                            board.sketch(6)
-                        if event.key in (pygame.K_7, pygame.K_KP7):
-                            board.sketch(7)
-                        if event.key in (pygame.K_8, pygame.K_KP8):
-                            board.sketch(8)
-                        if event.key in (pygame.K_9, pygame.K_KP9):
-                            board.sketch(9)
-
-                        if event.key == pygame.K_RETURN:
-                            temp = board.selected_cell.tempValue
-                            if temp != 0:
-                                board.place_number(temp)
-                                if board.is_full():
-                                    if board.check_board():
-                                        won = True
-                                    else:
-                                        won = False
-                                    game_over = True
-
-                        if event.key in (pygame.K_BACKSPACE, pygame.K_DELETE):
-                            board.clear()
-
-        board.draw()
-        board.draw_buttons()
-
-        # Checks if game over
-        if game_over:
-            if won:
-                board.draw_text_middle(screen, "You Win!", 50, (0, 255, 0))
-            else:
-                board.draw_text_middle(screen, "Game Over", 50, (255, 0, 0))
+'''
+Largest number of puzzles puzzle_from_id keeps cached
+'''
+PUZZLE_CACHE_SIZE = 4096
 
-        pygame.display.update()
-        clock.tick(60)
 
-    pygame.quit()
+'''
+Regenerates the unique-solution puzzle that a 64-bit puzzle ID stands for
+The ID seeds the generator, so the same (size, holes, puzzle_id) always gives the same
+puzzle and only the ID needs to be stored or shared. The most recently used results
+are kept in an LRU cache (see puzzle_from_id.cache_info() and cache_clear()), which is
+why the boards come back as immutable CompactBoards.
+IDs are only stable for as long as the generation algorithm itself does not change
+
+Parameters:
+size is the number of rows/columns of the board
+holes is the number of cells to clear
+puzzle_id is an int from 0 to 2**64 - 1, e.g. from new_puzzle_id()
+
+Return: (CompactBoard, CompactBoard) - the puzzle and its solution
+'''
+
+
+@functools.lru_cache(maxsize=PUZZLE_CACHE_SIZE)
+def puzzle_from_id(size, holes, puzzle_id):
+    if not 0 <= puzzle_id < 2 ** 64:
+        raise ValueError("puzzle_id must be a 64-bit unsigned int")
+    board, solution = generate_sudoku_with_solution(size, holes, unique=True, rng=random.Random(puzzle_id))
+    return CompactBoard.from_board(board), CompactBoard.from_board(solution)
+
+
+'''
+Picks a random 64-bit puzzle ID for puzzle_from_id
+
+Parameters: None
+Return: int
+'''
+
+
+def new_puzzle_id():
+    return int.from_bytes(os.urandom(8), "little")
+
+
+'''
+Writes a board as one line of text, row by row - the usual 81-character format for 9x9
+Empty cells are 0, and values above 9 (on 16x16 and 25x25 boards) use A, B, C, ...
+
+Parameters:
+board is a 2D list of ints
+
+Return: str
+'''
+
+
+def board_to_string(board):
+    line = ""
+    for row in board:
+        for num in row:
+            line += DIGITS[num]
+    return line
+
+
+'''
+Reads a board written by board_to_string (. is accepted for an empty cell as well)
+
+Parameters:
+line is the text of one board, of length N*N
+
+Return: list[list]
+'''
+
+
+def string_to_board(line):
+    line = line.strip()
+    n = int(math.sqrt(len(line)))
+    if n * n != len(line):
+        raise ValueError("a board needs a square number of cells, got " + str(len(line)))
+    board = []
+    for row in range(n):
+        values = []
+        for ch in line[row * n:row * n + n]:
+            values.append(0 if ch == "." else DIGITS.index(ch.upper()))
+        board.append(values)
+    return board
+
+
+class CompactBoard:
+    '''
+    an immutable board stored as one byte per cell (81 bytes for 9x9) instead of nested lists
+    This should initialize:
+    self.data			- the cell values, row by row, as bytes (0 for empty)
+    self.size			- the number of rows/columns
+
+    Because the bytes never change, copying is free (copy returns the same object),
+    and boards can be used as dict keys or set members - the hash of a bytes object
+    is computed once and then cached. __slots__ leaves out the per-instance __dict__.
+
+    Parameters:
+    data is a bytes-like object of size*size cell values
+    size is the number of rows/columns (default: worked out from len(data))
+
+    Return:
+    None
+    '''
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, data, size=None):
+        data = bytes(data)
+        if size is None:
+            size = int(math.sqrt(len(data)))
+        if size * size != len(data):
+            raise ValueError("a " + str(size) + "x" + str(size) + " board needs " + str(size * size) +
+                             " cells, got " + str(len(data)))
+        self.data = data
+        self.size = size
+
+    '''
+    Builds a CompactBoard from the 2D list format used by SudokuGenerator and Board
+
+	Parameters:
+	board is a 2D list of ints
+
+	Return: CompactBoard
+    '''
+
+    @classmethod
+    def from_board(cls, board):
+        data = bytearray()
+        for row in board:
+            data.extend(row)
+        return cls(data, len(board))
+
+    '''
+    Returns the board as a new 2D list, the format used by SudokuGenerator and Board
+
+	Parameters: None
+	Return: list[list]
+    '''
+
+    def to_board(self):
+        n = self.size
+        data = self.data
+        return [list(data[row * n:row * n + n]) for row in range(n)]
+
+    '''
+    Returns the value at (row, col), 0 if empty
+
+	Parameters:
+	row and col are the row index and col index of the cell
+
+	Return: int
+    '''
+
+    def get(self, row, col):
+        return self.data[row * self.size + col]
+
+    '''
+    Returns a new board with num written at (row, col) - the board itself never changes
+
+	Parameters:
+	row and col are the row index and col index of the cell
+	num is the value to write (0 for empty)
+
+	Return: CompactBoard
+    '''
+
+    def with_value(self, row, col, num):
+        data = bytearray(self.data)
+        data[row * self.size + col] = num
+        return CompactBoard(data, self.size)
+
+    def copy(self):
+        return self
+
+    def __bytes__(self):
+        return self.data
+
+    def __str__(self):
+        return board_to_string(self.to_board())
+
+    def __repr__(self):
+        return "CompactBoard(" + repr(str(self)) + ")"
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactBoard):
+            return NotImplemented
+        return self.data == other.data
+
+    def __hash__(self):
+        return hash(self.data)
+
+
+class PuzzlePrefetcher:
+    '''
+    keeps a queue of ready-made puzzles for each difficulty, filled by a background thread
+    This should initialize:
+    self.size			- the number of rows/columns of each puzzle
+    self.unique			- whether puzzles must have exactly one solution
+    self.queues			- a dict of difficulty (cells removed) -> queue.Queue of puzzles
+
+    The worker thread tops up whichever queue is emptiest and sleeps once every queue
+    holds depth puzzles, until get() takes one out again. Puzzles come from
+    generate_sudoku, or from source.get(difficulty) if a source is given, so a slow
+    source such as sudoku_rater.RatedPuzzleSource can do its work in the background.
+
+    Parameters:
+    difficulties is the list of removed-cell counts to keep puzzles for
+    depth is how many puzzles to keep ready per difficulty
+    size is the number of rows/columns of the board
+    unique is passed to generate_sudoku
+    source is an optional object with a get(difficulty) method to take puzzles from
+
+    Return:
+    None
+    '''
+
+    def __init__(self, difficulties=(30, 40, 50), depth=3, size=9, unique=True, source=None):
+        # queue.Queue(0) has no limit, and the worker would never stop filling it
+        if depth < 1:
+            raise ValueError("depth must be at least 1, not " + str(depth))
+        self.size = size
+        self.unique = unique
+        self.source = source
+        self.queues = {}
+        for difficulty in difficulties:
+            self.queues[difficulty] = queue.Queue(depth)
+        self.wanted = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="PuzzlePrefetcher", daemon=True)
+        self.thread.start()
+
+    '''
+    Returns a puzzle for the given difficulty without waiting on the worker
+    Falls back to generating one right here if that queue is empty
+
+	Parameters:
+	difficulty is the number of cells to remove
+
+	Return: list[list]
+    '''
+
+    def get(self, difficulty):
+        self.wanted.set()
+        try:
+            return self.queues[difficulty].get_nowait()
+        except (KeyError, queue.Empty):
+            return self.generate(difficulty)
+
+    '''
+    Makes one new puzzle, from the source if there is one
+
+	Parameters:
+	difficulty is the number of cells to remove
+
+	Return: list[list]
+    '''
+
+    def generate(self, difficulty):
+        if self.source is not None:
+            return self.source.get(difficulty)
+        return generate_sudoku(self.size, difficulty, unique=self.unique)
+
+    '''
+    Worker thread loop - generates puzzles until stop is called
+
+	Parameters: None
+	Return: None
+    '''
+
+    def run(self):
+        while not self.stopped.is_set():
+            difficulty = None
+            for d in self.queues:
+                if not self.queues[d].full():
+                    if difficulty is None or self.queues[d].qsize() < self.queues[difficulty].qsize():
+                        difficulty = d
+            if difficulty is None:
+                self.wanted.wait()
+                self.wanted.clear()
+                continue
+            puzzle = self.generate(difficulty)
+            try:
+                self.queues[difficulty].put_nowait(puzzle)
+            except queue.Full:
+                pass
+
+    '''
+    Stops the worker thread and waits for it to finish its current puzzle
+
+	Parameters: None
+	Return: None
+    '''
+
+    def stop(self):
+        self.stopped.set()
+        self.wanted.set()
+        self.thread.join()
+
+
+'''
+The pygame game (GlyphCache, Cell, Board, main) lives in sudoku.py so that the generator
+can be imported without pygame. Those names are still reachable from this module for
+older code - sudoku.py, and with it pygame, is only imported the first time one is used
+
+Parameters:
+name is the attribute being looked up
+
+Return: the attribute from sudoku.py
+'''
+
 
+def __getattr__(name):
+    if name in ("GlyphCache", "glyphs", "Cell", "Board", "main"):
+        import sudoku
+        return getattr(sudoku, name)
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
 
-pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    import sudoku
+    sudoku.main()
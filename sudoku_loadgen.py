@@ -0,0 +1,165 @@
+import argparse, asyncio, json, math, sys, time
+
+"""
+Load generator for sudoku_server.py - reports throughput and latency percentiles
+
+    python3 sudoku_server.py --port 8080 &
+    python3 sudoku_loadgen.py --port 8080 --clients 50 --duration 10
+    python3 sudoku_loadgen.py --port 8080 --clients 50 --rate 2000 --path '/puzzle?difficulty=50'
+
+Every client keeps one keep-alive connection open. By default each sends its next
+request as soon as the last reply arrives. With --rate the clients instead send on a
+fixed schedule adding up to that many requests per second, and latency is counted from
+when a request was due rather than when it was sent, so a stalled server cannot hide
+its stalls by slowing the clients down.
+
+"""
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+'''
+Returns the p-th percentile of a sorted list (nearest rank)
+
+Parameters:
+values is a sorted list of numbers
+p is the percentile, 0 to 100
+
+Return: float
+'''
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+'''
+Sends one GET request and reads the whole reply
+
+Parameters:
+reader and writer are the connection's asyncio streams
+host is the Host header
+path is the request target
+
+Return: int (the status code)
+'''
+
+
+async def request(reader, writer, host, path):
+    writer.write(("GET " + path + " HTTP/1.1\r\nHost: " + host + "\r\n\r\n").encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, sep, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+'''
+One client - sends requests until the deadline and records their latencies
+
+Parameters:
+args is the parsed command line
+deadline is the time.perf_counter() value to stop at
+interval is the time between requests for --rate, or None to send back to back
+offset is how far into the first interval this client starts, to spread the clients out
+latencies is the list to add latencies (in seconds) to
+errors is a one-item list counting failed requests
+
+Return: None
+'''
+
+
+async def client(args, deadline, interval, offset, latencies, errors):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    host = args.host + ":" + str(args.port)
+    due = time.perf_counter() + offset
+    sent = 0
+    try:
+        while True:
+            if interval is not None:
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                start = due
+                due += interval
+            else:
+                start = time.perf_counter()
+            if start >= deadline:
+                break
+            path = args.path[sent % len(args.path)]
+            sent += 1
+            status = await request(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[0] += 1
+    finally:
+        writer.close()
+
+
+'''
+Runs every client and gathers the results
+
+Parameters:
+args is the parsed command line
+
+Return: dict of the results
+'''
+
+
+async def run(args):
+    latencies = []
+    errors = [0]
+    interval = args.clients / args.rate if args.rate else None
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[client(args, deadline, interval, (interval or 0) * i / args.clients, latencies, errors)
+                           for i in range(args.clients)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {"requests": len(latencies), "errors": errors[0], "seconds": elapsed,
+              "requests_per_second": len(latencies) / elapsed, "clients": args.clients, "rate": args.rate}
+    for p in PERCENTILES:
+        result["p" + str(p) + "_ms"] = percentile(latencies, p) * 1000
+    result["max_ms"] = (latencies[-1] if latencies else float("nan")) * 1000
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the latency of a running sudoku_server.py.")
+    parser.add_argument("--host", default="127.0.0.1", help="server address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="server port (default: 8080)")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections (default: 50)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run for (default: 10)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="total requests per second to send on a fixed schedule (default: as fast as possible)")
+    parser.add_argument("--path", action="append", default=None,
+                        help="request target, repeat to rotate between several (default: /puzzle?difficulty=40)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    args.path = args.path or ["/puzzle?difficulty=40"]
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print("%d requests in %.1f s (%.0f/s), %d errors" % (result["requests"], result["seconds"],
+                                                         result["requests_per_second"], result["errors"]))
+    print("  ".join("p%s %.2f ms" % (p, result["p" + str(p) + "_ms"]) for p in PERCENTILES) +
+          "  max %.2f ms" % result["max_ms"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
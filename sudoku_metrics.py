@@ -0,0 +1,317 @@
+import atexit, bisect, json, os, threading, time
+
+"""
+Optional instrumentation for puzzle generation and the game loop
+
+Off by default. Instrumented code only records anything after enable() is called, or
+when the SUDOKU_METRICS environment variable names a file to write the metrics to when
+the program exits:
+    SUDOKU_METRICS=metrics.prom python3 sudoku.py
+    SUDOKU_METRICS=metrics.json python3 sudoku_cli.py --count 1000 --unique > /dev/null
+
+While disabled, hot code pays one check of the enabled flag (or one phase() call that
+hands back a shared do-nothing timer), so leaving the hooks in costs close to nothing.
+Metrics are kept per process: puzzles made by worker processes are not counted.
+
+Files ending in .json get JSON, anything else the Prometheus text format.
+
+"""
+
+enabled = False
+
+'''
+Histogram bucket upper bounds, in seconds
+'''
+PHASE_BUCKETS = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0)
+FRAME_BUCKETS = (0.0005, 0.001, 0.002, 0.004, 0.008, 0.0167, 0.033, 0.05, 0.1, 0.25)
+
+'''
+Every metric that can be recorded: name -> (type, help text, label name, histogram buckets)
+'''
+METRICS = {
+    "sudoku_generation_phase_seconds": ("histogram", "Time spent in each phase of puzzle generation.",
+                                        "phase", PHASE_BUCKETS),
+    "sudoku_fill_remaining_nodes_total": ("counter", "Cells placed by the fill_remaining search.", None, None),
+    "sudoku_fill_remaining_backtracks_total": ("counter", "Placements undone by the fill_remaining search.",
+                                               None, None),
+    "sudoku_fill_restarts_total": ("counter", "fill_remaining searches abandoned and restarted by fill_values.",
+                                   None, None),
+    "sudoku_frame_seconds": ("histogram", "Time per main loop frame (not counting idle waits), by part.",
+                             "part", FRAME_BUCKETS),
+}
+
+
+class Histogram:
+    '''
+    counts of observed values per bucket, plus their sum
+    This should initialize:
+    self.buckets		- the bucket upper bounds, in increasing order
+    self.counts			- observations per bucket, with one more for values above the last bound
+    self.sum			- the sum of every observed value
+    self.count			- the number of observed values
+
+    Parameters:
+    buckets is the tuple of bucket upper bounds
+
+    Return:
+    None
+    '''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    '''
+    holds the recorded values of every metric in METRICS
+    This should initialize:
+    self.values			- a dict of (metric name, label value) -> Histogram or number
+
+    Recording takes a lock, since puzzles are also generated on PuzzlePrefetcher's thread.
+
+    Parameters: None
+
+    Return:
+    None
+    '''
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    '''
+    Adds a value to a histogram metric
+
+	Parameters:
+	name is a histogram in METRICS
+	value is the value to add, e.g. seconds
+	label is the value of the metric's label, e.g. the phase
+
+	Return: None
+    '''
+
+    def observe(self, name, value, label=None):
+        with self.lock:
+            histogram = self.values.get((name, label))
+            if histogram is None:
+                histogram = Histogram(METRICS[name][3])
+                self.values[(name, label)] = histogram
+            histogram.observe(value)
+
+    '''
+    Adds to a counter metric
+
+	Parameters:
+	name is a counter in METRICS
+	amount is how much to add
+	label is the value of the metric's label
+
+	Return: None
+    '''
+
+    def add(self, name, amount=1, label=None):
+        with self.lock:
+            self.values[(name, label)] = self.values.get((name, label), 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.values = {}
+
+    '''
+    Formats every recorded metric in the Prometheus text exposition format
+
+	Parameters: None
+	Return: str
+    '''
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, (kind, help_text, label_name, buckets) in METRICS.items():
+                recorded = [(label, value) for (metric, label), value in self.values.items() if metric == name]
+                recorded.sort(key=lambda item: "" if item[0] is None else str(item[0]))
+                if not recorded:
+                    continue
+                lines.append("# HELP " + name + " " + help_text)
+                lines.append("# TYPE " + name + " " + kind)
+                for label, value in recorded:
+                    labels = []
+                    if label is not None:
+                        labels.append(label_name + '="' + str(label) + '"')
+                    if kind == "counter":
+                        lines.append(name + format_labels(labels) + " " + repr(value))
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets + (float("inf"),), value.counts):
+                        cumulative += count
+                        bound = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(name + "_bucket" + format_labels(labels + ['le="' + bound + '"']) + " " +
+                                     str(cumulative))
+                    lines.append(name + "_sum" + format_labels(labels) + " " + repr(value.sum))
+                    lines.append(name + "_count" + format_labels(labels) + " " + str(value.count))
+        return "\n".join(lines) + "\n"
+
+    '''
+    Returns every recorded metric as plain dicts and lists, ready for json.dump
+
+	Parameters: None
+	Return: dict of metric name -> {"type", "label", "values": {label value -> number or histogram}}
+    '''
+
+    def to_json(self):
+        result = {}
+        with self.lock:
+            for (name, label), value in sorted(self.values.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+                kind, help_text, label_name, buckets = METRICS[name]
+                metric = result.setdefault(name, {"type": kind, "label": label_name, "values": {}})
+                if kind == "histogram":
+                    value = {"buckets": list(value.buckets), "counts": list(value.counts),
+                             "sum": value.sum, "count": value.count}
+                metric["values"]["" if label is None else str(label)] = value
+        return result
+
+    '''
+    Writes the metrics to a file - JSON if the name ends in .json, Prometheus text otherwise
+
+	Parameters:
+	path is the file to write
+
+	Return: None
+    '''
+
+    def write(self, path):
+        if path.endswith(".json"):
+            text = json.dumps({"created": time.time(), "metrics": self.to_json()}, indent=2)
+        else:
+            text = self.to_prometheus()
+        with open(path, "w") as out:
+            out.write(text)
+
+
+'''
+Joins Prometheus label pairs into {a="x",b="y"}, or nothing if there are none
+
+Parameters:
+labels is a list of 'name="value"' strings
+
+Return: str
+'''
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(labels) + "}"
+
+
+registry = Registry()
+
+
+class PhaseTimer:
+    '''
+    a with-block that adds its running time to sudoku_generation_phase_seconds
+    This should initialize:
+    self.name			- the phase label
+    self.start			- the time.perf_counter() value when the block was entered
+
+    Parameters:
+    name is the phase label
+
+    Return:
+    None
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        registry.observe("sudoku_generation_phase_seconds", time.perf_counter() - self.start, self.name)
+
+
+class NoTimer:
+    # stands in for PhaseTimer while metrics are disabled
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NO_TIMER = NoTimer()
+
+
+'''
+Times a phase of puzzle generation:
+    with sudoku_metrics.phase("remove_cells"):
+        ...
+
+Parameters:
+name is the phase label
+
+Return: PhaseTimer, or a shared do-nothing timer while disabled
+'''
+
+
+def phase(name):
+    if enabled:
+        return PhaseTimer(name)
+    return NO_TIMER
+
+
+'''
+Adds one main loop frame to sudoku_frame_seconds, from time.perf_counter() values taken
+after the events arrived, after they were handled, after the board was drawn, and after
+the display was updated
+
+Parameters:
+start, handled, drawn, and updated are the four times
+
+Return: None
+'''
+
+
+def record_frame(start, handled, drawn, updated):
+    registry.observe("sudoku_frame_seconds", handled - start, "events")
+    registry.observe("sudoku_frame_seconds", drawn - handled, "draw")
+    registry.observe("sudoku_frame_seconds", updated - drawn, "update")
+    registry.observe("sudoku_frame_seconds", updated - start, "frame")
+
+
+'''
+Starts recording metrics
+
+Parameters:
+path is an optional file to write the metrics to when the program exits
+
+Return: None
+'''
+
+
+def enable(path=None):
+    global enabled
+    enabled = True
+    if path is not None:
+        atexit.register(registry.write, path)
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+if os.environ.get("SUDOKU_METRICS"):
+    enable(os.environ["SUDOKU_METRICS"])
@@ -0,0 +1,420 @@
+import math, random, threading
+from collections import namedtuple
+import numpy as np
+from sudoku_generator import generate_sudoku
+from sudoku_validate import as_board_array, or_reduce, popcount
+
+"""
+Rates puzzles by the human solving techniques they need (needs NumPy)
+
+A whole batch is solved side by side on candidate grids: one uint32 per cell with bit d
+set while d is still possible there. Each round, every board applies the easiest
+technique below that makes progress on it, and the round repeats until the board is
+solved or no technique helps. All techniques are whole-array bit operations over the
+batch - the only Python loops are over technique, round, and the few cells of a unit.
+
+Techniques, easiest first (their level is their position, starting at 1):
+    naked single        a cell with one candidate left
+    hidden single       a digit with one place left in a row, column, or box
+    pointing            a digit confined to one row/column of a box is removed from the
+                        rest of that row/column
+    box/line reduction  a digit confined to one box within a row/column is removed from
+                        the rest of that box
+    naked pair          two cells of a unit with the same two candidates; those digits
+                        are removed from the rest of the unit
+
+"""
+
+TECHNIQUES = ("naked single", "hidden single", "pointing", "box/line reduction", "naked pair")
+
+'''
+Score added each time a technique is used - per cell placed for the singles, and per
+round of eliminations for the others
+'''
+WEIGHTS = (1, 2, 4, 5, 6)
+
+'''
+Level and extra score for a puzzle the techniques above cannot finish (it needs guessing
+or a harder technique)
+'''
+UNSOLVED_LEVEL = len(TECHNIQUES) + 1
+UNSOLVED_SCORE = 1000
+
+BLOCK = 1 << 14
+
+'''
+How RatedPuzzleSource reads the difficulty screen's choices (30, 40, 50 cells removed):
+difficulty -> ((lowest, highest) hardest technique level, (fewest, most) holes to generate with)
+'''
+RATED_TIERS = {
+    30: ((1, 1), (36, 46)),
+    40: ((2, 2), (48, 56)),
+    50: ((3, len(TECHNIQUES)), (54, 58)),
+}
+
+'''
+Result of rate_puzzles - one array entry per puzzle
+score			- the weighted number of technique uses, plus UNSOLVED_SCORE if unfinished
+hardest			- the level of the hardest technique needed (0 if already solved,
+UNSOLVED_LEVEL if the techniques were not enough)
+solved			- whether the techniques finished the puzzle
+uses			- (N, len(TECHNIQUES)) array of how often each technique was used
+'''
+Rating = namedtuple("Rating", ["score", "hardest", "solved", "uses"])
+
+
+'''
+Rates a batch of puzzles
+
+Parameters:
+puzzles is a batch of boards in any form sudoku_validate.as_board_array accepts
+size is passed to as_board_array for bytes-like input
+
+Return: Rating
+'''
+
+
+def rate_puzzles(puzzles, size=None):
+    puzzles = as_board_array(puzzles, size)
+    count = puzzles.shape[0]
+    score = np.zeros(count, dtype=np.int32)
+    hardest = np.zeros(count, dtype=np.int8)
+    solved = np.zeros(count, dtype=bool)
+    uses = np.zeros((count, len(TECHNIQUES)), dtype=np.int32)
+    for start in range(0, count, BLOCK):
+        end = start + BLOCK
+        rating = rate_block(puzzles[start:end])
+        score[start:end], hardest[start:end], solved[start:end], uses[start:end] = rating
+    return Rating(score, hardest, solved, uses)
+
+
+'''
+Rates one block of puzzles - see rate_puzzles
+
+Parameters:
+puzzles is an (N, size, size) uint8 array
+
+Return: Rating
+'''
+
+
+def rate_block(puzzles):
+    grid = CandidateGrid(puzzles)
+    count = puzzles.shape[0]
+    score = np.zeros(count, dtype=np.int32)
+    hardest = np.zeros(count, dtype=np.int8)
+    uses = np.zeros((count, len(TECHNIQUES)), dtype=np.int32)
+    steps = (grid.naked_singles, grid.hidden_singles, grid.pointing, grid.box_line_reduction, grid.naked_pairs)
+
+    active = np.nonzero(~grid.finished())[0]
+    while active.size > 0:
+        todo = active
+        for level in range(len(steps)):
+            if todo.size == 0:
+                break
+            amount = steps[level](todo)
+            progress = amount > 0
+            done = todo[progress]
+            score[done] += WEIGHTS[level] * amount[progress]
+            uses[done, level] += 1
+            hardest[done] = np.maximum(hardest[done], level + 1)
+            todo = todo[~progress]
+        # boards in todo are stuck - nothing applied to them this round
+        stuck = np.zeros(count, dtype=bool)
+        stuck[todo] = True
+        active = active[~stuck[active] & ~grid.finished()[active]]
+
+    solved = grid.solved()
+    score[~solved] += UNSOLVED_SCORE
+    hardest[~solved] = UNSOLVED_LEVEL
+    return Rating(score, hardest, solved, uses)
+
+
+class CandidateGrid:
+    '''
+    the values and candidate bitsets of a batch of boards being solved by logic
+    This should initialize:
+    self.values			- (N, size, size) uint8 array of placed digits (0 for empty)
+    self.candidates		- (N, size, size) uint32 array, bit d set while d is possible (0 once filled)
+
+    Every technique method takes an index array of the boards to work on, changes only
+    those boards, and returns how much it did per board (cells placed, or 1 if it
+    removed any candidates), so 0 means the technique did not apply.
+
+    Parameters:
+    puzzles is an (N, size, size) uint8 array
+
+    Return:
+    None
+    '''
+
+    def __init__(self, puzzles):
+        self.size = puzzles.shape[1]
+        self.box_length = int(math.sqrt(self.size))
+        self.values = puzzles.copy()
+        self.bit_of = np.zeros(256, dtype=np.uint32)
+        self.bit_of[1:self.size + 1] = np.left_shift(1, np.arange(1, self.size + 1, dtype=np.uint32))
+        full = np.uint32(((1 << (self.size + 1)) - 1) & ~1)
+        empty = self.values == 0
+        self.candidates = np.where(empty, full & ~self.peer_digits(self.values), np.uint32(0))
+
+    '''
+    Reorders the cells of (N, size, size) arrays so axis 1 is the box and axis 2 the cell
+    within it. Applying it twice gives back the original order
+
+	Parameters:
+	a is an (N, size, size) array
+
+	Return: numpy.ndarray
+    '''
+
+    def boxes(self, a):
+        k = self.box_length
+        return a.reshape(-1, k, k, k, k).transpose(0, 1, 3, 2, 4).reshape(-1, self.size, self.size)
+
+    '''
+    For every cell, the bits of all digits placed in its row, column, and box
+
+	Parameters:
+	values is an (N, size, size) uint8 array
+
+	Return: numpy.ndarray of uint32
+    '''
+
+    def peer_digits(self, values):
+        bits = self.bit_of[values]
+        used = or_reduce(bits, 2)[:, :, None] | or_reduce(bits, 1)[:, None, :]
+        box_used = np.broadcast_to(or_reduce(self.boxes(bits), 2)[:, :, None], bits.shape)
+        return used | self.boxes(box_used)
+
+    def finished(self):
+        return (self.values != 0).all(axis=(1, 2))
+
+    '''
+    Whether each board is completely and correctly filled
+
+	Parameters: None
+	Return: numpy.ndarray of bool
+    '''
+
+    def solved(self):
+        bits = self.bit_of[self.values]
+        full = np.uint32(((1 << (self.size + 1)) - 1) & ~1)
+        rows = (or_reduce(bits, 2) == full).all(axis=1)
+        cols = (or_reduce(bits, 1) == full).all(axis=1)
+        boxes = (or_reduce(self.boxes(bits), 2) == full).all(axis=1)
+        return rows & cols & boxes
+
+    '''
+    Writes the digits in place_bits (one bit per cell, 0 for no change) into the boards
+    in todo and removes them from the candidates of their peers
+
+	Parameters:
+	todo is an index array of boards
+	place_bits is a (len(todo), size, size) uint32 array
+
+	Return: numpy.ndarray (cells placed per board)
+    '''
+
+    def place(self, todo, place_bits):
+        placing = place_bits != 0
+        values = self.values[todo]
+        values[placing] = popcount(place_bits[placing] - np.uint32(1))
+        candidates = np.where(placing, np.uint32(0), self.candidates[todo])
+        self.values[todo] = values
+        self.candidates[todo] = candidates & ~self.peer_digits(values)
+        return placing.sum(axis=(1, 2))
+
+    def naked_singles(self, todo):
+        candidates = self.candidates[todo]
+        single = popcount(candidates) == 1
+        return self.place(todo, np.where(single, candidates, np.uint32(0)))
+
+    def hidden_singles(self, todo):
+        candidates = self.candidates[todo]
+        found = np.zeros_like(candidates)
+        for unit, undo in ((candidates, None), (candidates.transpose(0, 2, 1), "transpose"),
+                           (self.boxes(candidates), "boxes")):
+            # digits seen in exactly one cell of each unit
+            once = np.zeros(unit.shape[:2], dtype=np.uint32)
+            twice = np.zeros_like(once)
+            for cell in range(self.size):
+                twice |= once & unit[:, :, cell]
+                once |= unit[:, :, cell]
+            hidden = unit & (once & ~twice)[:, :, None]
+            if undo == "transpose":
+                hidden = hidden.transpose(0, 2, 1)
+            elif undo == "boxes":
+                hidden = self.boxes(hidden)
+            found |= hidden
+        # a cell can only take one digit - keep the lowest if a broken puzzle offers more
+        return self.place(todo, found & (~found + np.uint32(1)))
+
+    '''
+    Removes the candidates in remove from the boards in todo
+
+	Parameters:
+	todo is an index array of boards
+	remove is a (len(todo), size, size) uint32 array of candidate bits to remove
+
+	Return: numpy.ndarray (1 for boards that lost a candidate, else 0)
+    '''
+
+    def eliminate(self, todo, remove):
+        candidates = self.candidates[todo]
+        changed = (candidates & remove) != 0
+        self.candidates[todo] = candidates & ~remove
+        return changed.any(axis=(1, 2)).astype(np.int32)
+
+    '''
+    Runs pointing (within_box=True) or box/line reduction (within_box=False) along rows,
+    or along columns if columns is True
+
+	Parameters:
+	candidates is a (len(todo), size, size) uint32 array
+	within_box is a boolean - which of the two techniques to run
+	columns is a boolean - whether to work along columns instead of rows
+
+	Return: numpy.ndarray (the candidate bits to remove)
+    '''
+
+    def intersections(self, candidates, within_box, columns):
+        k = self.box_length
+        if columns:
+            candidates = candidates.transpose(0, 2, 1)
+        # segments[:, band, line, stack] - the candidates where a row meets a box
+        segments = or_reduce(candidates.reshape(-1, k, k, k, k), 4)
+        # axis the digit must be confined along: other lines of the box for pointing,
+        # other boxes of the row for box/line reduction
+        axis = 2 if within_box else 3
+        confined = np.empty_like(segments)
+        for i in range(k):
+            others = np.zeros_like(np.take(segments, i, axis=axis))
+            for j in range(k):
+                if j != i:
+                    others |= np.take(segments, j, axis=axis)
+            index = [slice(None)] * 4
+            index[axis] = i
+            confined[tuple(index)] = np.take(segments, i, axis=axis) & ~others
+
+        # remove confined digits from the segments on the other axis
+        other_axis = 3 if within_box else 2
+        remove = np.zeros_like(segments)
+        for i in range(k):
+            for j in range(k):
+                if j != i:
+                    index = [slice(None)] * 4
+                    index[other_axis] = i
+                    remove[tuple(index)] |= np.take(confined, j, axis=other_axis)
+        remove = np.broadcast_to(remove[..., None], segments.shape + (k,)).reshape(candidates.shape)
+        if columns:
+            remove = remove.transpose(0, 2, 1)
+        return remove
+
+    def pointing(self, todo):
+        candidates = self.candidates[todo]
+        remove = self.intersections(candidates, True, False) | self.intersections(candidates, True, True)
+        return self.eliminate(todo, remove)
+
+    def box_line_reduction(self, todo):
+        candidates = self.candidates[todo]
+        remove = self.intersections(candidates, False, False) | self.intersections(candidates, False, True)
+        return self.eliminate(todo, remove)
+
+    def naked_pairs(self, todo):
+        candidates = self.candidates[todo]
+        remove = np.zeros_like(candidates)
+        for unit, undo in ((candidates, None), (candidates.transpose(0, 2, 1), "transpose"),
+                           (self.boxes(candidates), "boxes")):
+            counts = popcount(unit)
+            unit_remove = np.zeros_like(unit)
+            for i in range(self.size):
+                for j in range(i + 1, self.size):
+                    pair = np.where((unit[:, :, i] == unit[:, :, j]) & (counts[:, :, i] == 2),
+                                    unit[:, :, i], np.uint32(0))[:, :, None]
+                    unit_remove |= np.where(unit != pair, pair, np.uint32(0))
+            if undo == "transpose":
+                unit_remove = unit_remove.transpose(0, 2, 1)
+            elif undo == "boxes":
+                unit_remove = self.boxes(unit_remove)
+            remove |= unit_remove
+        return self.eliminate(todo, remove)
+
+
+class RatedPuzzleSource:
+    '''
+    hands out puzzles by rated difficulty instead of by hole count
+    This should initialize:
+    self.tiers			- a dict of difficulty -> (level range, hole range), like RATED_TIERS
+    self.pools			- a dict of difficulty -> list of rated puzzles waiting to be used
+    self.rng			- the random.Random puzzles are generated from
+
+    Puzzles are generated in groups of batch, with hole counts from the asked-for tier,
+    rated together with rate_puzzles, and sorted into the pool of whichever tier
+    they fall in, so puzzles that miss one tier still stock another. A pool keeps at most
+    depth puzzles. It has the same get(difficulty) method as PuzzlePrefetcher and
+    CorpusReader, so it can be passed to Board, or to PuzzlePrefetcher(source=...) to
+    do the generating in the background.
+
+    Parameters:
+    tiers is a dict like RATED_TIERS
+    batch is the number of puzzles generated and rated at a time
+    depth is the most puzzles kept per tier
+    size is the number of rows/columns of the board
+    rng is a random.Random, or a seed for one
+
+    Return:
+    None
+    '''
+
+    def __init__(self, tiers=None, batch=32, depth=16, size=9, rng=None):
+        # get() waits for a puzzle to be filed, which never happens with either below 1
+        if batch < 1 or depth < 1:
+            raise ValueError("batch and depth must be at least 1")
+        self.tiers = dict(tiers or RATED_TIERS)
+        self.batch = batch
+        self.depth = depth
+        self.size = size
+        self.rng = rng if isinstance(rng, random.Random) else random.Random(rng)
+        self.pools = {}
+        for difficulty in self.tiers:
+            self.pools[difficulty] = []
+        self.lock = threading.Lock()
+
+    '''
+    Returns a puzzle from the tier closest to difficulty, generating more if its pool is empty
+
+	Parameters:
+	difficulty is a key of self.tiers (the closest key is used otherwise)
+
+	Return: list[list]
+    '''
+
+    def get(self, difficulty):
+        difficulty = min(self.tiers, key=lambda d: abs(d - difficulty))
+        with self.lock:
+            while not self.pools[difficulty]:
+                self.refill(difficulty)
+            return self.pools[difficulty].pop()
+
+    '''
+    Generates and rates one batch of unique puzzles for a tier and files them by rating
+
+	Parameters:
+	difficulty is a key of self.tiers
+
+	Return: None
+    '''
+
+    def refill(self, difficulty):
+        fewest, most = self.tiers[difficulty][1]
+        puzzles = []
+        for i in range(self.batch):
+            holes = self.rng.randint(fewest, most)
+            puzzles.append(generate_sudoku(self.size, holes, unique=True, rng=self.rng))
+        rating = rate_puzzles(puzzles)
+        for i in range(len(puzzles)):
+            for tier, (levels, holes) in self.tiers.items():
+                if levels[0] <= rating.hardest[i] <= levels[1] and len(self.pools[tier]) < self.depth:
+                    self.pools[tier].append(puzzles[i])
+                    break
@@ -0,0 +1,454 @@
+import argparse, asyncio, collections, json, os, random, sys
+from urllib.parse import parse_qs, urlsplit
+from sudoku_generator import CompactBoard, check_removed, generate_sudoku_chunk, new_puzzle_id
+
+"""
+Local HTTP puzzle server that hands out pre-generated puzzles
+
+    python3 sudoku_server.py --port 8080 --workers 0
+    curl 'http://127.0.0.1:8080/puzzle?difficulty=40'
+
+Endpoints (all replies are JSON):
+    GET  /puzzle?difficulty=N   a puzzle from the pool for N holes: {"id", "difficulty", "puzzle"}
+    GET  /solution?id=ID        the solution of a puzzle handed out earlier: {"id", "solution"}
+    POST /validate              body {"board": [[...]]} plus optionally the puzzle's "id" -
+                                {"valid", "complete", "solved", "conflicts", "keeps_givens"}
+    GET  /stats                 pool levels, jobs in flight, and puzzles served
+
+Every difficulty has a pool of ready puzzles, so a request never waits on generation.
+Pools are refilled by worker processes in chunks with low/high watermarks: once a pool
+(counting the chunks already on their way) drops below the low mark, chunks are
+requested until it reaches the high mark. At most two chunks per worker are in flight,
+so a burst cannot queue unbounded work. If a pool does run dry, requests wait for the
+next chunk instead of generating on the event loop.
+
+sudoku_loadgen.py measures the latency this gives under concurrent load.
+
+"""
+
+MAX_BODY = 1 << 16
+MAX_HEADERS = 100
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class HTTPError(Exception):
+    '''
+    an error reply to send instead of the normal response
+    This should initialize:
+    self.status			- the HTTP status code
+    self.message		- the text sent back as {"error": message}
+
+    Parameters:
+    status and message are stored as above
+
+    Return:
+    None
+    '''
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PuzzlePool:
+    '''
+    the ready puzzles for one difficulty
+    This should initialize:
+    self.difficulty		- the number of holes in its puzzles
+    self.puzzles		- a deque of (CompactBoard, CompactBoard) puzzle and solution pairs
+    self.pending		- the number of puzzles on their way from the workers
+    self.refilling		- True from dropping below the low mark until reaching the high mark
+    self.waiters		- futures of requests waiting for the pool to refill
+
+    Parameters:
+    difficulty is the number of holes
+
+    Return:
+    None
+    '''
+
+    def __init__(self, difficulty):
+        self.difficulty = difficulty
+        self.puzzles = collections.deque()
+        self.pending = 0
+        self.refilling = False
+        self.waiters = collections.deque()
+        self.served = 0
+
+    def level(self):
+        return len(self.puzzles) + self.pending
+
+
+class SudokuServer:
+    '''
+    serves puzzles over HTTP from per-difficulty pools refilled by worker processes
+    This should initialize:
+    self.pools			- a dict of difficulty -> PuzzlePool
+    self.issued			- the most recently handed out puzzles, id -> (puzzle, solution)
+    self.jobs			- the number of chunks being generated
+
+    Parameters:
+    difficulties is the list of hole counts to keep pools for
+    low and high are the refill watermarks, in puzzles per pool (1 <= low < high)
+    workers is the number of generator processes (None or 0 for os.cpu_count())
+    chunk_size is the number of puzzles a worker makes per job (at least 1)
+    size is the number of rows/columns of the board
+    unique is passed to the generator
+    remember is how many handed out puzzles /solution and /validate can look up
+
+    Return:
+    None
+    '''
+
+    def __init__(self, difficulties=(30, 40, 50), low=64, high=256, workers=None, chunk_size=16, size=9,
+                 unique=True, remember=100000):
+        # a pool is only refilled once it is below low, so low=0 would never refill at all
+        if low < 1:
+            raise ValueError("the low watermark must be at least 1")
+        if low >= high:
+            raise ValueError("the low watermark must be below the high watermark")
+        # an empty chunk never raises a pool's level, so refill would resubmit forever
+        if chunk_size < 1:
+            raise ValueError("the chunk size must be at least 1")
+        if workers is not None and workers < 0:
+            raise ValueError("the number of workers must not be negative")
+        self.pools = {}
+        for difficulty in difficulties:
+            check_removed(size, difficulty, unique)
+            self.pools[difficulty] = PuzzlePool(difficulty)
+        self.low = low
+        self.high = high
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.size = size
+        self.unique = unique
+        self.remember = remember
+        self.issued = collections.OrderedDict()
+        self.jobs = 0
+        self.seeds = random.Random()
+        self.executor = None
+
+    '''
+    Starts the worker processes and fills every pool up to the high mark in the background
+
+	Parameters: None
+	Return: None
+    '''
+
+    async def start(self):
+        # imported here so importing this module does not pull in multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self.executor = ProcessPoolExecutor(self.workers)
+        self.refill()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    '''
+    Requests chunks for the pools that need them, as far as the job limit allows
+    The emptiest pool (relative to the high mark) is served first
+
+	Parameters: None
+	Return: None
+    '''
+
+    def refill(self):
+        if self.executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        for pool in self.pools.values():
+            if pool.level() < self.low:
+                pool.refilling = True
+        while self.jobs < 2 * self.workers:
+            wanted = [pool for pool in self.pools.values() if pool.refilling]
+            if not wanted:
+                return
+            pool = min(wanted, key=lambda p: p.level())
+            job = loop.run_in_executor(self.executor, generate_sudoku_chunk, self.size, pool.difficulty,
+                                       self.unique, "backtrack", self.seeds.getrandbits(64), self.chunk_size)
+            job.add_done_callback(lambda future, pool=pool: self.chunk_done(pool, future))
+            self.jobs += 1
+            pool.pending += self.chunk_size
+            if pool.level() >= self.high:
+                pool.refilling = False
+
+    '''
+    Adds a finished chunk to its pool, first handing puzzles to any waiting requests
+
+	Parameters:
+	pool is the PuzzlePool the chunk was made for
+	future is the finished job
+
+	Return: None
+    '''
+
+    def chunk_done(self, pool, future):
+        self.jobs -= 1
+        pool.pending -= self.chunk_size
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print("puzzle generation failed: " + repr(future.exception()), file=sys.stderr)
+            pool.refilling = True
+        else:
+            for puzzle, solution in future.result():
+                pool.puzzles.append((CompactBoard.from_board(puzzle), CompactBoard.from_board(solution)))
+            while pool.waiters and pool.puzzles:
+                waiter = pool.waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(pool.puzzles.popleft())
+        self.refill()
+
+    '''
+    Takes a puzzle from a pool, waiting for the next chunk if the pool is empty
+
+	Parameters:
+	difficulty is a key of self.pools
+
+	Return: (CompactBoard, CompactBoard) - the puzzle and its solution
+    '''
+
+    async def take(self, difficulty):
+        pool = self.pools.get(difficulty)
+        if pool is None:
+            raise HTTPError(404, "no pool for difficulty " + str(difficulty) + ", try one of " +
+                            ", ".join(str(d) for d in self.pools))
+        if pool.puzzles:
+            pair = pool.puzzles.popleft()
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            pool.waiters.append(waiter)
+            self.refill()
+            pair = await waiter
+        pool.served += 1
+        if pool.level() < self.low:
+            self.refill()
+        return pair
+
+    '''
+    Handles one request and returns its JSON reply
+
+	Parameters:
+	method is the HTTP method
+	target is the request target (path and query string)
+	body is the request body as bytes
+
+	Return: dict
+    '''
+
+    async def handle(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == "/puzzle":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            difficulty = parse_int(query.get("difficulty", ["40"])[0], "difficulty")
+            puzzle, solution = await self.take(difficulty)
+            puzzle_id = "%016x" % new_puzzle_id()
+            self.issued[puzzle_id] = (puzzle, solution)
+            if len(self.issued) > self.remember:
+                self.issued.popitem(last=False)
+            return {"id": puzzle_id, "difficulty": difficulty, "puzzle": puzzle.to_board()}
+
+        if url.path == "/solution":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            puzzle_id = query.get("id", [""])[0]
+            if puzzle_id not in self.issued:
+                raise HTTPError(404, "unknown or expired puzzle id")
+            return {"id": puzzle_id, "solution": self.issued[puzzle_id][1].to_board()}
+
+        if url.path == "/validate":
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            try:
+                request = json.loads(body)
+                board = request["board"]
+            except (ValueError, KeyError, TypeError):
+                raise HTTPError(400, 'expected a JSON body with a "board"')
+            puzzle = None
+            if request.get("id") is not None:
+                puzzle_id = str(request["id"])
+                if puzzle_id not in self.issued:
+                    raise HTTPError(404, "unknown or expired puzzle id")
+                puzzle = self.issued[puzzle_id][0]
+            return validate_board(board, self.size, puzzle)
+
+        if url.path == "/stats":
+            pools = {}
+            for difficulty, pool in self.pools.items():
+                pools[str(difficulty)] = {"ready": len(pool.puzzles), "pending": pool.pending,
+                                          "waiting": len(pool.waiters), "served": pool.served}
+            return {"pools": pools, "jobs": self.jobs, "workers": self.workers, "low": self.low, "high": self.high}
+
+        raise HTTPError(404, "no such endpoint: " + url.path)
+
+    '''
+    Serves one client connection, with keep-alive, until it closes
+
+	Parameters:
+	reader and writer are the connection's asyncio streams
+
+	Return: None
+    '''
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                for i in range(MAX_HEADERS):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, sep, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and \
+                    headers.get("connection", "").lower() != "close"
+                try:
+                    if len(parts) != 3:
+                        raise HTTPError(400, "malformed request line")
+                    length = parse_int(headers.get("content-length", "0"), "Content-Length")
+                    if not 0 <= length <= MAX_BODY:
+                        keep_alive = False
+                        raise HTTPError(413, "body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, reply = 200, await self.handle(parts[0], parts[1], body)
+                except HTTPError as error:
+                    status, reply = error.status, {"error": error.message}
+
+                data = json.dumps(reply, separators=(",", ":")).encode()
+                head = "HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n" % (
+                    status, REASONS[status], len(data))
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write(head.encode() + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+'''
+Parses an int from a request, as a 400 error if it is not one
+
+Parameters:
+text is the string to parse
+name is what it is, for the error message
+
+Return: int
+'''
+
+
+def parse_int(text, name):
+    try:
+        return int(text)
+    except ValueError:
+        raise HTTPError(400, name + " must be an integer")
+
+
+'''
+Checks a submitted board - the same counts as Board keeps in the game
+conflicts is the number of extra copies of a digit across all rows, columns, and boxes
+
+Parameters:
+board is a 2D list of ints (0 for empty)
+size is the expected number of rows/columns
+puzzle is an optional CompactBoard whose given cells the board must keep
+
+Return: dict
+'''
+
+
+def validate_board(board, size, puzzle=None):
+    if not isinstance(board, list) or len(board) != size or \
+            any(not isinstance(row, list) or len(row) != size for row in board):
+        raise HTTPError(400, "board must be a " + str(size) + "x" + str(size) + " list of lists")
+    k = int(size ** 0.5)
+    seen = set()
+    conflicts = 0
+    filled = 0
+    for row in range(size):
+        for col in range(size):
+            num = board[row][col]
+            if not isinstance(num, int) or not 0 <= num <= size:
+                raise HTTPError(400, "cell values must be integers from 0 to " + str(size))
+            if num == 0:
+                continue
+            filled += 1
+            for unit in (("row", row), ("col", col), ("box", (row // k) * k + col // k)):
+                if (unit, num) in seen:
+                    conflicts += 1
+                seen.add((unit, num))
+
+    keeps_givens = True
+    if puzzle is not None:
+        for row in range(size):
+            for col in range(size):
+                given = puzzle.get(row, col)
+                if given != 0 and board[row][col] != given:
+                    keeps_givens = False
+    complete = filled == size * size
+    return {"valid": conflicts == 0, "complete": complete, "solved": conflicts == 0 and complete and keeps_givens,
+            "conflicts": conflicts, "keeps_givens": keeps_givens}
+
+
+'''
+Runs the server until interrupted
+
+Parameters:
+server is a SudokuServer
+host and port are the address to listen on
+
+Return: None
+'''
+
+
+async def serve(server, host, port):
+    await server.start()
+    listener = await asyncio.start_server(server.serve_client, host, port)
+    print("serving puzzles on http://" + host + ":" + str(port), file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve sudoku puzzles over HTTP from pre-generated pools.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    parser.add_argument("--difficulties", default="30,40,50", help="hole counts to keep pools for (default: 30,40,50)")
+    parser.add_argument("--low", type=int, default=64, help="refill a pool below this many puzzles (default: 64)")
+    parser.add_argument("--high", type=int, default=256, help="refill a pool up to this many puzzles (default: 256)")
+    parser.add_argument("--workers", type=int, default=0, help="generator processes, 0 for one per CPU (default: 0)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="puzzles per generator job (default: 16)")
+    args = parser.parse_args(argv)
+
+    try:
+        difficulties = [int(d) for d in args.difficulties.split(",")]
+        server = SudokuServer(difficulties, args.low, args.high, args.workers or None, args.chunk_size)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,512 @@
+import math, os
+
+"""
+Exact cover sudoku solver using Knuth's Algorithm X with Dancing Links
+https://arxiv.org/abs/cs/0011047
+
+Every (row, col, num) placement is a row of the exact cover matrix and covers four
+columns: the cell, num in the row, num in the col, and num in the box. A solved
+board is a set of placements that covers every column exactly once.
+
+"""
+
+'''
+How many choices SudokuSolver.search makes between calls of its stop function
+'''
+STOP_CHECK_STEPS = 1024
+
+
+class SudokuSolver:
+    '''
+    create a solver for one puzzle - builds the dancing links matrix for the board
+    This should initialize:
+    self.row_length		- the length of each row
+    self.box_length		- the square root of row_length
+    self.board			- a copy of the puzzle (0 for empty cells)
+    self.conflict		- True if the given cells already break a rule
+
+    The matrix is stored as flat lists of ints (left, right, up, down, column) instead
+    of node objects. Index 0 is the root, 1 to the number of columns are the column
+    headers, and every node after that belongs to one placement. Columns already
+    satisfied by a given cell are left out, as are placements that clash with a
+    given cell, so the search only sees the empty part of the board.
+
+    Parameters:
+    board is a 2D list of ints (0 for empty), any size N where N is a perfect square
+
+    Return:
+    None
+    '''
+
+    def __init__(self, board):
+        self.row_length = len(board)
+        self.box_length = int(math.sqrt(self.row_length))
+        self.board = [row[:] for row in board]
+        self.conflict = False
+
+        n = self.row_length
+        k = self.box_length
+        size = n * n
+
+        # mark the columns the given cells already satisfy
+        done = [False] * (4 * size)
+        for row in range(n):
+            for col in range(n):
+                num = self.board[row][col]
+                if num == 0:
+                    continue
+                box = (row // k) * k + col // k
+                for column in (row * n + col, size + row * n + num - 1,
+                               2 * size + col * n + num - 1, 3 * size + box * n + num - 1):
+                    if done[column]:
+                        self.conflict = True
+                    done[column] = True
+
+        # column headers, linked into a ring through the root (index 0)
+        open_columns = [column for column in range(4 * size) if not done[column]]
+        header = {}
+        self.left = [0]
+        self.right = [0]
+        self.up = [0]
+        self.down = [0]
+        self.column = [0]
+        self.sizes = [0]
+        self.placements = [None]
+        for column in open_columns:
+            node = len(self.left)
+            header[column] = node
+            self.left.append(node - 1)
+            self.right.append(0)
+            self.right[node - 1] = node
+            self.left[0] = node
+            self.up.append(node)
+            self.down.append(node)
+            self.column.append(node)
+            self.sizes.append(0)
+            self.placements.append(None)
+
+        # one matrix row per placement that fits the given cells
+        for row in range(n):
+            for col in range(n):
+                if self.board[row][col] != 0:
+                    continue
+                box = (row // k) * k + col // k
+                for num in range(1, n + 1):
+                    columns = (row * n + col, size + row * n + num - 1,
+                               2 * size + col * n + num - 1, 3 * size + box * n + num - 1)
+                    if done[columns[1]] or done[columns[2]] or done[columns[3]]:
+                        continue
+                    first = len(self.left)
+                    for i in range(4):
+                        node = first + i
+                        head = header[columns[i]]
+                        self.left.append(first + (i - 1) % 4)
+                        self.right.append(first + (i + 1) % 4)
+                        self.up.append(self.up[head])
+                        self.down.append(head)
+                        self.down[self.up[head]] = node
+                        self.up[head] = node
+                        self.column.append(head)
+                        self.sizes[head] += 1
+                        self.placements.append((row, col, num))
+
+    '''
+    Runs Algorithm X and yields the chosen matrix nodes each time a solution is found
+    The search uses an explicit stack rather than recursion, so it works for large
+    boards and can be paused between solutions. The yielded list is reused by the
+    search, so copy it if it has to outlive the next step
+
+	Parameters:
+	stop is an optional function checked every STOP_CHECK_STEPS choices - the search
+	ends early once it returns True, even in a part of the tree with no solutions
+
+	Return: generator of list[int]
+    '''
+
+    def search(self, stop=None):
+        if self.conflict:
+            return
+
+        left = self.left
+        right = self.right
+        up = self.up
+        down = self.down
+        column = self.column
+        sizes = self.sizes
+
+        def cover(c):
+            right[left[c]] = right[c]
+            left[right[c]] = left[c]
+            i = down[c]
+            while i != c:
+                j = right[i]
+                while j != i:
+                    down[up[j]] = down[j]
+                    up[down[j]] = up[j]
+                    sizes[column[j]] -= 1
+                    j = right[j]
+                i = down[i]
+
+        def uncover(c):
+            i = up[c]
+            while i != c:
+                j = left[i]
+                while j != i:
+                    sizes[column[j]] += 1
+                    down[up[j]] = j
+                    up[down[j]] = j
+                    j = left[j]
+                i = up[i]
+            right[left[c]] = c
+            left[right[c]] = c
+
+        chosen = []
+        steps = 0
+        try:
+            while True:
+                if right[0] == 0:
+                    yield chosen
+                else:
+                    # branch on the column with the fewest remaining rows
+                    best = right[0]
+                    best_size = sizes[best]
+                    c = right[best]
+                    while c != 0 and best_size > 1:
+                        if sizes[c] < best_size:
+                            best = c
+                            best_size = sizes[c]
+                        c = right[c]
+
+                    if best_size > 0:
+                        if stop is not None:
+                            steps += 1
+                            if steps == STOP_CHECK_STEPS:
+                                steps = 0
+                                if stop():
+                                    return
+                        cover(best)
+                        r = down[best]
+                        chosen.append(r)
+                        j = right[r]
+                        while j != r:
+                            cover(column[j])
+                            j = right[j]
+                        continue
+
+                # backtrack to the most recent choice that still has another row to try
+                while chosen:
+                    r = chosen.pop()
+                    j = left[r]
+                    while j != r:
+                        uncover(column[j])
+                        j = left[j]
+                    c = column[r]
+                    r = down[r]
+                    if r != c:
+                        chosen.append(r)
+                        j = right[r]
+                        while j != r:
+                            cover(column[j])
+                            j = right[j]
+                        break
+                    uncover(c)
+                else:
+                    return
+        finally:
+            # put the matrix back if the caller stops early
+            while chosen:
+                r = chosen.pop()
+                j = left[r]
+                while j != r:
+                    uncover(column[j])
+                    j = left[j]
+                uncover(column[r])
+
+    '''
+    Lazily generates every solution of the board, one 2D list at a time
+
+	Parameters: None
+	Return: generator of list[list]
+    '''
+
+    def solutions(self):
+        for chosen in self.search():
+            solution = [row[:] for row in self.board]
+            for node in chosen:
+                row, col, num = self.placements[node]
+                solution[row][col] = num
+            yield solution
+
+    '''
+    Finds one solution of the board
+
+	Parameters: None
+	Return: list[list], or None if the board has no solution
+    '''
+
+    def solve(self):
+        for solution in self.solutions():
+            return solution
+        return None
+
+    '''
+    Counts the solutions of the board, stopping as soon as limit is reached
+    count(2) == 1 means the puzzle has a unique solution
+
+	Parameters:
+	limit is the number of solutions after which counting stops (None to count them all)
+
+	Return: int
+    '''
+
+    def count(self, limit=None):
+        found = 0
+        for chosen in self.search():
+            found += 1
+            if found == limit:
+                break
+        return found
+
+
+'''
+Solves a board with a new SudokuSolver
+
+Parameters:
+board is a 2D list of ints (0 for empty)
+
+Return: list[list], or None if the board has no solution
+'''
+
+
+def solve_sudoku(board):
+    return SudokuSolver(board).solve()
+
+
+'''
+Shared state of a count_solutions_parallel worker process - the running total of
+solutions found by every worker, the event that tells them all to stop, and the limit
+'''
+worker_shared = {}
+
+
+'''
+Splits a board into subproblems whose solutions together are exactly the board's
+Each level branches on the empty cell with the fewest candidates, one subproblem per
+candidate. Cells with a single candidate are filled in on the way without using up a
+level, and dead ends (a cell with no candidates) are dropped
+
+Parameters:
+board is a 2D list of ints (0 for empty), any size N where N is a perfect square
+depth is the number of branching levels
+
+Return: list of list[list] (boards that are already solved are returned unchanged)
+'''
+
+
+def split_board(board, depth):
+    boards = [[row[:] for row in board]]
+    for level in range(depth):
+        next_boards = []
+        for current in boards:
+            next_boards.extend(branch(current))
+        if next_boards == boards:
+            break
+        boards = next_boards
+    return boards
+
+
+'''
+One level of split_board - fills forced cells, then branches on the most constrained cell
+
+Parameters:
+board is a 2D list of ints, which may be changed
+
+Return: list of list[list] - the children, [board] if it is solved, or [] if it is a dead end
+'''
+
+
+def branch(board):
+    n = len(board)
+    k = int(math.sqrt(n))
+    full = ((1 << (n + 1)) - 1) & ~1
+    while True:
+        rows = [0] * n
+        cols = [0] * n
+        boxes = [0] * n
+        for row in range(n):
+            for col in range(n):
+                num = board[row][col]
+                if num != 0:
+                    bit = 1 << num
+                    box = (row // k) * k + col // k
+                    if (rows[row] | cols[col] | boxes[box]) & bit:
+                        return []
+                    rows[row] |= bit
+                    cols[col] |= bit
+                    boxes[box] |= bit
+
+        best = None
+        best_free = 0
+        best_count = n + 1
+        for row in range(n):
+            for col in range(n):
+                if board[row][col] == 0:
+                    free = full & ~(rows[row] | cols[col] | boxes[(row // k) * k + col // k])
+                    count = bin(free).count("1")
+                    if count < best_count:
+                        best = (row, col)
+                        best_free = free
+                        best_count = count
+                        if count <= 1:
+                            break
+            if best_count <= 1:
+                break
+
+        if best is None:
+            return [board]
+        if best_count == 0:
+            return []
+        row, col = best
+        if best_count == 1:
+            board[row][col] = best_free.bit_length() - 1
+            continue
+
+        children = []
+        for num in range(1, n + 1):
+            if best_free & (1 << num):
+                child = [line[:] for line in board]
+                child[row][col] = num
+                children.append(child)
+        return children
+
+
+'''
+Counts the solutions of a board by splitting its search tree over a pool of processes
+
+The board is split with split_board into independent subproblems, and each one is
+counted by its own SudokuSolver. Subproblems are handed out one at a time from the
+pool's shared queue, so a worker that finishes a small one just takes the next instead
+of sitting idle while the others work through big ones. With a limit, the workers add
+the solutions they find to a shared total, and once it reaches the limit a shared event
+is set, the subproblems not yet started are cancelled, and the result is returned
+without waiting for the workers. Their searches check the event every
+STOP_CHECK_STEPS choices, so they stop soon after even where they find no solutions.
+
+Parameters:
+board is a 2D list of ints (0 for empty), any size N where N is a perfect square
+limit is the number of solutions after which counting stops (None to count them all)
+workers is the number of processes (default: os.cpu_count(); 1 counts in this process)
+split_depth is the number of branching levels to split at (default: deep enough for
+about 8 subproblems per worker)
+
+Return: int (the number of solutions, at most limit)
+'''
+
+
+def count_solutions_parallel(board, limit=None, workers=None, split_depth=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if limit is not None and limit <= 0:
+        return 0
+
+    if split_depth is not None:
+        subproblems = split_board(board, split_depth)
+    else:
+        subproblems = split_board(board, 0)
+        while 0 < len(subproblems) < 8 * workers:
+            deeper = []
+            for sub in subproblems:
+                deeper.extend(branch(sub))
+            if deeper == subproblems:
+                break
+            subproblems = deeper
+
+    if workers == 1:
+        found = 0
+        for sub in subproblems:
+            found += SudokuSolver(sub).count(None if limit is None else limit - found)
+            if found == limit:
+                break
+        return found
+
+    # imported here so callers that never count in parallel don't pay for multiprocessing
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    total = multiprocessing.Value("q", 0)
+    stop = multiprocessing.Event()
+    found = 0
+    pool = ProcessPoolExecutor(workers, initializer=start_worker, initargs=(total, stop, limit))
+    try:
+        futures = [pool.submit(count_subproblem, sub) for sub in subproblems]
+        for future in as_completed(futures):
+            found += future.result()
+            if limit is not None and found >= limit:
+                break
+    finally:
+        # workers still searching see the event and exit on their own
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    if limit is not None:
+        return min(found, limit)
+    return found
+
+
+'''
+Worker process initializer for count_solutions_parallel
+
+Parameters:
+total is the multiprocessing.Value holding the solutions reported by every worker
+stop is the multiprocessing.Event set once the limit is reached
+limit is the limit passed to count_solutions_parallel
+
+Return: None
+'''
+
+
+def start_worker(total, stop, limit):
+    worker_shared["total"] = total
+    worker_shared["stop"] = stop
+    worker_shared["limit"] = limit
+
+
+'''
+Worker task for count_solutions_parallel - counts one subproblem, stopping early once
+the solutions reported by all workers together reach the limit
+
+Parameters:
+board is a 2D list of ints
+
+Return: int (the solutions this task found)
+'''
+
+
+def count_subproblem(board):
+    total = worker_shared["total"]
+    stop = worker_shared["stop"]
+    limit = worker_shared["limit"]
+    if stop.is_set():
+        return 0
+    if limit is None:
+        return sum(1 for chosen in SudokuSolver(board).search(stop.is_set))
+
+    # solutions are reported a few at a time, since every report takes the total's lock,
+    # so workers together may run past the limit by up to report solutions each
+    report = max(1, limit // 64)
+    found = 0
+    reported = 0
+    for chosen in SudokuSolver(board).search(stop.is_set):
+        found += 1
+        if found - reported >= report:
+            with total.get_lock():
+                total.value += found - reported
+                reached = total.value >= limit
+            reported = found
+            if reached:
+                stop.set()
+            if stop.is_set():
+                break
+    if found > reported:
+        with total.get_lock():
+            total.value += found - reported
+    return found
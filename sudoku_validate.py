@@ -0,0 +1,178 @@
+import math
+from collections import namedtuple
+import numpy as np
+from sudoku_generator import CompactBoard
+
+"""
+Vectorized validation for large batches of boards (needs NumPy)
+
+Boards are checked as one (N, size, size) uint8 array, with no Python loop per board
+or per cell. Every digit d becomes the bit 1 << d, and OR-ing those bits over a row,
+column, or box gives the set of distinct digits in it. A unit with c filled cells and
+b distinct digits holds exactly c - b extra copies, so conflicts fall out of a few
+reductions over the matching axes. Work is split into blocks of BLOCK boards to bound
+the size of the temporary arrays.
+
+"""
+
+BLOCK = 1 << 16
+
+
+'''
+Number of set bits in every element of an unsigned int array
+
+Parameters:
+values is a numpy array of uint32
+
+Return: numpy.ndarray
+'''
+
+
+def popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    low = POPCOUNT_16[values & 0xFFFF]
+    return low + POPCOUNT_16[values >> 16]
+
+
+POPCOUNT_16 = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)
+
+
+'''
+Bitwise OR of an array along one axis
+Does the same as np.bitwise_or.reduce, but as one whole-array OR per position along
+the axis, which is much faster when that axis is short (9 cells) and the others are long
+
+Parameters:
+values is a numpy array of uint32
+axis is the axis to reduce
+
+Return: numpy.ndarray
+'''
+
+
+def or_reduce(values, axis):
+    values = np.moveaxis(values, axis, 0)
+    result = values[0].copy()
+    for i in range(1, values.shape[0]):
+        result |= values[i]
+    return result
+
+'''
+Result of validate_boards - one array entry per board
+valid			- no digit repeats in a row, column, or box, and every value is 0 to size
+complete		- no empty (0) cells
+solved			- valid and complete
+conflicts		- the number of extra copies of a digit across all rows, columns, and boxes
+(the same count Board.conflicts keeps), plus one for every out-of-range value
+'''
+BatchResult = namedtuple("BatchResult", ["valid", "complete", "solved", "conflicts"])
+
+
+'''
+Converts a batch of boards into one (N, size, size) uint8 array
+
+Parameters:
+boards is any of:
+    an array of shape (N, size, size) or (N, size * size)
+    a sequence of CompactBoards
+    a sequence of 2D lists
+    a bytes-like object holding N boards of size * size bytes back to back
+size is the number of rows/columns, only needed for bytes-like input (default: 9)
+
+Return: numpy.ndarray
+'''
+
+
+def as_board_array(boards, size=None):
+    if isinstance(boards, (bytes, bytearray, memoryview)):
+        size = size or 9
+        flat = np.frombuffer(boards, dtype=np.uint8)
+        if flat.size % (size * size) != 0:
+            raise ValueError("buffer length is not a multiple of " + str(size * size))
+        return flat.reshape(-1, size, size)
+
+    if not isinstance(boards, np.ndarray):
+        boards = list(boards)
+        if boards and isinstance(boards[0], CompactBoard):
+            size = boards[0].size
+            flat = np.frombuffer(b"".join([board.data for board in boards]), dtype=np.uint8)
+            return flat.reshape(-1, size, size)
+        boards = np.asarray(boards, dtype=np.uint8)
+
+    if boards.ndim == 1 and boards.size == 0:
+        # an empty batch, e.g. the last chunk of a stream, has no shape to go by
+        size = size or 9
+        return np.zeros((0, size, size), dtype=np.uint8)
+    if boards.ndim == 2:
+        size = int(math.sqrt(boards.shape[1]))
+        boards = boards.reshape(-1, size, size)
+    if boards.ndim != 3 or boards.shape[1] != boards.shape[2]:
+        raise ValueError("expected boards of shape (N, size, size), got " + str(boards.shape))
+    return boards.astype(np.uint8, copy=False)
+
+
+'''
+Checks every board in a batch at once
+
+Parameters:
+boards is a batch of boards in any form as_board_array accepts
+size is passed to as_board_array for bytes-like input
+
+Return: BatchResult
+'''
+
+
+def validate_boards(boards, size=None):
+    boards = as_board_array(boards, size)
+    count, n = boards.shape[0], boards.shape[1]
+    k = int(math.sqrt(n))
+    if k * k != n:
+        raise ValueError("board size " + str(n) + " is not a perfect square")
+
+    # digit d -> bit d; empty cells and out-of-range values -> no bit
+    bit_of = np.zeros(256, dtype=np.uint32)
+    bit_of[1:n + 1] = np.left_shift(1, np.arange(1, n + 1, dtype=np.uint32))
+
+    conflicts = np.empty(count, dtype=np.int32)
+    complete = np.empty(count, dtype=bool)
+    for start in range(0, count, BLOCK):
+        block = boards[start:start + BLOCK]
+        bits = bit_of[block]
+        filled = bits != 0
+        boxed = bits.reshape(-1, k, k, k, k)
+
+        # filled cells minus distinct digits, summed over every row, column, and box
+        extra = 3 * filled.sum(axis=(1, 2), dtype=np.int32)
+        extra -= popcount(or_reduce(bits, 2)).sum(axis=1, dtype=np.int32)
+        extra -= popcount(or_reduce(bits, 1)).sum(axis=1, dtype=np.int32)
+        extra -= popcount(or_reduce(or_reduce(boxed, 4), 2)).sum(axis=(1, 2), dtype=np.int32)
+        extra += (block > n).sum(axis=(1, 2), dtype=np.int32)
+
+        conflicts[start:start + BLOCK] = extra
+        complete[start:start + BLOCK] = (block != 0).all(axis=(1, 2))
+
+    valid = conflicts == 0
+    return BatchResult(valid, complete, valid & complete, conflicts)
+
+
+'''
+Checks submitted solutions against their puzzles
+A solution passes if it is solved and keeps every given cell of its puzzle
+
+Parameters:
+puzzles and solutions are batches of the same length, in any form as_board_array accepts
+size is passed to as_board_array for bytes-like input
+
+Return: numpy.ndarray of bool, one per pair
+'''
+
+
+def check_solutions(puzzles, solutions, size=None):
+    puzzles = as_board_array(puzzles, size)
+    solutions = as_board_array(solutions, size)
+    if puzzles.shape != solutions.shape:
+        raise ValueError("puzzles and solutions differ in shape: " + str(puzzles.shape) + " vs " +
+                         str(solutions.shape))
+    keeps_givens = ((puzzles == 0) | (puzzles == solutions)).all(axis=(1, 2))
+    return validate_boards(solutions).solved & keeps_givens
@@ -0,0 +1,141 @@
+import itertools, os, random, tempfile
+from sudoku_canonical import DedupIndex, canonical_form
+from sudoku_generator import generate_sudoku
+
+"""
+Checks of canonical_form against a brute-force minlex search on 4x4 boards, and of
+its invariance under the symmetry group on 9x9 boards
+
+    python3 -m pytest test_canonical.py
+
+"""
+
+
+'''
+Every order of the lines of a board that keeps them grouped in bands
+
+Parameters:
+k is the box length
+
+Return: list of tuples
+'''
+
+
+def band_orders(k):
+    orders = []
+    for bands in itertools.permutations(range(k)):
+        for inner in itertools.product(list(itertools.permutations(range(k))), repeat=k):
+            orders.append(tuple(bands[b] * k + inner[b][i] for b in range(k) for i in range(k)))
+    return orders
+
+
+'''
+Relabels the digits of a board in order of first appearance, read row by row
+
+Parameters:
+cells is the board as a flat tuple (0 for empty)
+
+Return: tuple
+'''
+
+
+def relabel(cells):
+    labels = {0: 0}
+    for value in cells:
+        if value not in labels:
+            labels[value] = len(labels)
+    return tuple(labels[value] for value in cells)
+
+
+'''
+The canonical form found by trying every layout of the board
+
+Parameters:
+board is a 2D list
+
+Return: tuple (the cells of the smallest layout, row by row)
+'''
+
+
+def brute_force_minlex(board):
+    n = len(board)
+    k = int(n ** 0.5)
+    orders = band_orders(k)
+    transposed = [[board[c][r] for c in range(n)] for r in range(n)]
+    best = None
+    for grid in (board, transposed):
+        for rows in orders:
+            for cols in orders:
+                cells = relabel(tuple(grid[r][c] for r in rows for c in cols))
+                if best is None or cells < best:
+                    best = cells
+    return best
+
+
+'''
+Applies a random symmetry to a board: a relabeling, line and band orders, and a transpose
+
+Parameters:
+board is a 2D list
+rng is a random.Random
+
+Return: list[list]
+'''
+
+
+def random_symmetry(board, rng):
+    n = len(board)
+    k = int(n ** 0.5)
+    orders = band_orders(k)
+    rows = rng.choice(orders)
+    cols = rng.choice(orders)
+    digits = list(range(1, n + 1))
+    rng.shuffle(digits)
+    digits.insert(0, 0)
+    if rng.random() < 0.5:
+        board = [[board[c][r] for c in range(n)] for r in range(n)]
+    return [[digits[board[r][c]] for c in cols] for r in rows]
+
+
+def test_matches_brute_force_4x4():
+    rng = random.Random(1)
+    for i in range(150):
+        board = generate_sudoku(4, rng.randint(0, 12), rng=rng)
+        assert tuple(canonical_form(board).data) == brute_force_minlex(board)
+
+
+def test_invariant_under_symmetry_9x9():
+    rng = random.Random(2)
+    for holes in (0, 45, 60):
+        board = generate_sudoku(9, holes, rng=rng)
+        form = canonical_form(board)
+        for i in range(5):
+            assert canonical_form(random_symmetry(board, rng)) == form
+
+
+def test_dedup_index_file():
+    rng = random.Random(4)
+    boards = [generate_sudoku(9, 50, rng=rng) for i in range(10)]
+    path = os.path.join(tempfile.mkdtemp(), "seen.idx")
+    with DedupIndex(path) as index:
+        for board in boards:
+            assert index.add(board)
+        assert not index.add(random_symmetry(boards[0], rng))
+    with DedupIndex(path) as index:
+        assert len(index) == 10
+        assert random_symmetry(boards[3], rng) in index
+        assert list(index.filter([(board, None) for board in boards])) == []
+
+    # an interrupted run can leave part of a hash at the end of the file
+    with open(path, "ab") as out:
+        out.write(b"\x01\x02\x03")
+    more = [generate_sudoku(9, 50, rng=rng) for i in range(2)]
+    with DedupIndex(path) as index:
+        assert len(index) == 10
+        for board in more:
+            assert index.add(board)
+    with DedupIndex(path) as index:
+        assert len(index) == 12
+        for board in boards + more:
+            assert board in index
+    os.remove(path)
@@ -0,0 +1,105 @@
+import os, tempfile
+import pytest
+from sudoku_corpus import HEADER, CorpusReader, CorpusWriter
+from sudoku_generator import generate_sudoku_with_solution
+
+"""
+Write/read round trips of the binary puzzle bank
+
+    python3 -m pytest test_corpus.py
+
+"""
+
+
+'''
+A path for a bank file in a new temporary directory
+
+Parameters: None
+Return: str
+'''
+
+
+def bank_path():
+    return os.path.join(tempfile.mkdtemp(), "test.bank")
+
+
+'''
+Puzzles with a mix of hole counts, as (puzzle, solution, rating, seed) tuples
+
+Parameters:
+count is the number of puzzles
+
+Return: list of tuples
+'''
+
+
+def sample_puzzles(count):
+    puzzles = []
+    for i in range(count):
+        puzzle, solution = generate_sudoku_with_solution(9, 30 + 5 * (i % 4), rng=i)
+        puzzles.append((puzzle, solution, i + 1, 1000 + i))
+    return puzzles
+
+
+def test_round_trip():
+    path = bank_path()
+    puzzles = sample_puzzles(12)
+    with CorpusWriter(path) as writer:
+        for puzzle, solution, rating, seed in puzzles:
+            writer.add(puzzle, solution, rating, seed)
+
+    with CorpusReader(path) as reader:
+        assert len(reader) == 12
+        assert reader.size == 9
+        read = []
+        for i in range(len(reader)):
+            puzzle, solution, holes, rating, seed = reader.record(i)
+            assert holes == sum(row.count(0) for row in puzzle.to_board())
+            read.append((puzzle.to_board(), solution.to_board(), rating, seed))
+        assert sorted(read) == sorted(puzzles)
+
+        # records are grouped by hole count
+        for holes in (30, 35, 40, 45):
+            records = reader.records_with(holes)
+            assert len(records) == 3
+            assert all(reader.record(i)[2] == holes for i in records)
+        assert len(reader.records_with(50)) == 0
+        assert sum(row.count(0) for row in reader.get(44)) == 45
+        with pytest.raises(IndexError):
+            reader.record(12)
+
+
+def test_close_twice_keeps_the_bank():
+    path = bank_path()
+    with CorpusWriter(path) as writer:
+        for puzzle, solution, rating, seed in sample_puzzles(5):
+            writer.add(puzzle, solution, rating, seed)
+        writer.close()
+        with pytest.raises(ValueError):
+            writer.add(puzzle, solution)
+    with CorpusReader(path) as reader:
+        assert len(reader) == 5
+
+
+def test_empty_bank():
+    path = bank_path()
+    CorpusWriter(path).close()
+    with CorpusReader(path) as reader:
+        assert len(reader) == 0
+        with pytest.raises(LookupError):
+            reader.get(40)
+
+
+def test_broken_files():
+    path = bank_path()
+    with CorpusWriter(path) as writer:
+        for puzzle, solution, rating, seed in sample_puzzles(3):
+            writer.add(puzzle, solution, rating, seed)
+    with open(path, "rb") as saved:
+        data = saved.read()
+
+    for broken in (b"", data[:10], data[:HEADER.size], data[:-1], b"x" * len(data)):
+        with open(path, "wb") as out:
+            out.write(broken)
+        with pytest.raises(ValueError):
+            CorpusReader(path)
@@ -0,0 +1,85 @@
+import numpy as np
+from sudoku_generator import generate_sudoku_batch, generate_sudoku_with_solution
+from sudoku_rater import UNSOLVED_LEVEL, CandidateGrid, rate_puzzles
+
+"""
+Checks of the technique rater against the known solutions of unique puzzles
+
+    python3 -m pytest test_rater.py
+
+"""
+
+
+'''
+Unique puzzles and their solutions as (N, 9, 9) arrays
+
+Parameters:
+count is the number of puzzles
+holes is the number of cells to clear
+seed is the batch seed
+
+Return: (numpy.ndarray, numpy.ndarray)
+'''
+
+
+def unique_puzzles(count, holes, seed):
+    pairs = list(generate_sudoku_batch(count, holes, workers=1, unique=True, seed=seed))
+    puzzles = np.array([puzzle for puzzle, solution in pairs], dtype=np.uint8)
+    solutions = np.array([solution for puzzle, solution in pairs], dtype=np.uint8)
+    return puzzles, solutions
+
+
+def test_techniques_only_make_sound_moves():
+    # every placement must match the solution, and no elimination may remove the
+    # solution's digit, after every single technique step
+    puzzles, solutions = unique_puzzles(64, 58, 1)
+    grid = CandidateGrid(puzzles)
+    steps = (grid.naked_singles, grid.hidden_singles, grid.pointing, grid.box_line_reduction, grid.naked_pairs)
+    everyone = np.arange(len(puzzles))
+    solution_bits = np.left_shift(1, solutions.astype(np.uint32))
+    for attempt in range(200):
+        progress = False
+        for step in steps:
+            progress |= bool((step(everyone) > 0).any())
+            placed = grid.values != 0
+            assert (grid.values[placed] == solutions[placed]).all()
+            assert (grid.candidates[~placed] & solution_bits[~placed]).all()
+        if not progress:
+            break
+    assert (grid.values[grid.solved()] == solutions[grid.solved()]).all()
+
+
+def test_ratings():
+    puzzles, solutions = unique_puzzles(128, 55, 2)
+    rating = rate_puzzles(puzzles)
+    assert (rating.solved == (rating.hardest < UNSOLVED_LEVEL)).all()
+    assert (rating.score[~rating.solved] >= 1000).all()
+    assert (rating.uses.sum(axis=1)[rating.solved] > 0).all()
+
+    # a solved board needs nothing, one hole needs a naked single
+    one_hole = solutions[:1].copy()
+    one_hole[0, 4, 4] = 0
+    rating = rate_puzzles(np.concatenate([solutions[:1], one_hole]))
+    assert rating.hardest.tolist() == [0, 1]
+    assert rating.score.tolist() == [0, 1]
+    assert rating.solved.all()
+
+
+def test_unsolvable_by_techniques():
+    # the empty board cannot be finished by these techniques
+    rating = rate_puzzles(np.zeros((1, 9, 9), dtype=np.uint8))
+    assert not rating.solved[0]
+    assert rating.hardest[0] == UNSOLVED_LEVEL
+
+
+def test_empty_batch():
+    rating = rate_puzzles([])
+    assert rating.score.shape == (0,)
+    assert rating.uses.shape[0] == 0
+
+
+def test_rated_puzzle_is_unchanged():
+    puzzle, solution = generate_sudoku_with_solution(9, 50, unique=True, rng=5)
+    before = [row[:] for row in puzzle]
+    rate_puzzles([puzzle])
+    assert puzzle == before
@@ -0,0 +1,92 @@
+import random
+from sudoku_generator import SudokuGenerator, generate_sudoku_with_solution
+from sudoku_solver import SudokuSolver, solve_sudoku
+
+"""
+Cross-checks of the Dancing Links solver against SudokuGenerator.count_solutions
+
+    python3 -m pytest test_solver.py
+
+"""
+
+
+'''
+Builds a random puzzle as a SudokuGenerator, so count_solutions can be run on it
+
+Parameters:
+size is the number of rows/columns of the board
+holes is the number of cells to clear
+seed is the RNG seed
+
+Return: SudokuGenerator
+'''
+
+
+def random_puzzle(size, holes, seed):
+    generator = SudokuGenerator(size, holes, random.Random(seed))
+    generator.fill_values()
+    generator.remove_cells()
+    return generator
+
+
+'''
+Checks that board is a solved grid that keeps every given cell of puzzle
+
+Parameters:
+puzzle and board are 2D lists
+
+Return: None
+'''
+
+
+def assert_solves(puzzle, board):
+    n = len(puzzle)
+    k = int(n ** 0.5)
+    digits = set(range(1, n + 1))
+    for i in range(n):
+        assert set(board[i]) == digits
+        assert set(board[r][i] for r in range(n)) == digits
+        assert set(board[(i // k) * k + r][(i % k) * k + c] for r in range(k) for c in range(k)) == digits
+        for j in range(n):
+            assert puzzle[i][j] in (0, board[i][j])
+
+
+def test_count_matches_count_solutions():
+    for size, holes in ((4, 10), (9, 55), (9, 62)):
+        for seed in range(60):
+            generator = random_puzzle(size, holes, seed)
+            board = generator.get_board()
+            for limit in (1, 2, 5):
+                assert SudokuSolver(board).count(limit) == generator.count_solutions(limit)
+
+
+def test_count_all_4x4():
+    # every 4x4 grid: the empty board has 288 solutions
+    empty = [[0] * 4 for i in range(4)]
+    assert SudokuSolver(empty).count() == 288
+    assert len(list(SudokuSolver(empty).solutions())) == 288
+
+
+def test_solutions_are_valid_and_distinct():
+    generator = random_puzzle(9, 60, 7)
+    puzzle = generator.get_board()
+    seen = set()
+    for board in SudokuSolver(puzzle).solutions():
+        assert_solves(puzzle, board)
+        seen.add(tuple(map(tuple, board)))
+    assert len(seen) == generator.count_solutions(10 ** 6)
+
+
+def test_solve_unique_puzzles():
+    for size, holes in ((9, 55), (16, 120)):
+        puzzle, solution = generate_sudoku_with_solution(size, holes, unique=True, rng=size)
+        assert solve_sudoku(puzzle) == solution
+        assert SudokuSolver(puzzle).count() == 1
+
+
+def test_conflicting_givens():
+    puzzle, solution = generate_sudoku_with_solution(9, 40, rng=3)
+    puzzle[0][0] = puzzle[0][1] = solution[0][0]
+    assert SudokuSolver(puzzle).conflict
+    assert SudokuSolver(puzzle).solve() is None
+    assert SudokuSolver(puzzle).count() == 0